@@ -1,6 +1,22 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ArduinofeatureConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'arduinofeature'
+
+    def ready(self):
+        if not getattr(settings, 'SMOKE_READER_AUTOSTART', False):
+            return
+        # Only the process serving requests reads the sensor: not other
+        # management commands, nor runserver's autoreload parent
+        if os.path.basename(sys.argv[0]) == 'manage.py':
+            command = sys.argv[1] if len(sys.argv) > 1 else ''
+            if command != 'runserver' or os.environ.get('RUN_MAIN') != 'true':
+                return
+        from .reader import start_reader
+        start_reader()
@@ -0,0 +1,125 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .models import SmokeData
+
+logger = logging.getLogger(__name__)
+
+
+class SmokeWriteBuffer:
+    """Collects smoke readings and writes them with one bulk INSERT per batch.
+
+    A batch is flushed once it holds `batch_size` readings, or `flush_ms`
+    after its first reading, whichever comes first. Readings keep the time
+    they were taken, not the time they were written. A failed flush keeps
+    its rows for the next attempt, up to `max_pending` readings.
+    """
+
+    def __init__(self, batch_size=None, flush_ms=None, max_pending=None):
+        self.batch_size = batch_size or getattr(settings, 'SMOKE_WRITE_BATCH_SIZE', 50)
+        self.flush_ms = flush_ms or getattr(settings, 'SMOKE_WRITE_FLUSH_MS', 1000)
+        self.max_pending = max_pending or getattr(settings, 'SMOKE_WRITE_MAX_PENDING', 10000)
+        self._pending = []
+        self._first_added = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher = None
+        self.stats = {
+            'flushes': 0,
+            'rows_written': 0,
+            'failed_flushes': 0,
+            'dropped': 0,
+            'last_flush_ms': None,
+            'max_flush_ms': 0.0,
+            'total_flush_ms': 0.0,
+            'max_depth': 0,
+        }
+
+    def add(self, smoke_level, status, timestamp):
+        with self._lock:
+            self._pending.append(SmokeData(smoke_level=smoke_level, status=status, timestamp=timestamp))
+            if self._first_added is None:
+                self._first_added = time.monotonic()
+            depth = len(self._pending)
+            self.stats['max_depth'] = max(self.stats['max_depth'], depth)
+        self._ensure_flusher()
+        if depth >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every pending reading; return how many rows were written"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._pending, self._first_added = self._pending, [], None
+            if not rows:
+                return 0
+
+            started = time.perf_counter()
+            try:
+                close_old_connections()
+                SmokeData.objects.bulk_create(rows, batch_size=500)
+            except Exception as e:
+                logger.error(f"Failed to write {len(rows)} smoke readings: {e}")
+                self._requeue(rows)
+                return 0
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            with self._lock:
+                self.stats['flushes'] += 1
+                self.stats['rows_written'] += len(rows)
+                self.stats['last_flush_ms'] = round(elapsed_ms, 2)
+                self.stats['max_flush_ms'] = round(max(self.stats['max_flush_ms'], elapsed_ms), 2)
+                self.stats['total_flush_ms'] += elapsed_ms
+            logger.debug(f"Wrote {len(rows)} smoke readings in {elapsed_ms:.1f}ms")
+            return len(rows)
+
+    def _requeue(self, rows):
+        with self._lock:
+            self.stats['failed_flushes'] += 1
+            self._pending = rows + self._pending
+            overflow = len(self._pending) - self.max_pending
+            if overflow > 0:
+                # Drop the oldest readings rather than grow without bound
+                del self._pending[:overflow]
+                self.stats['dropped'] += overflow
+                logger.warning(f"Smoke write buffer full, dropped {overflow} readings")
+            if self._pending and self._first_added is None:
+                self._first_added = time.monotonic()
+
+    def metrics(self):
+        """Flush latency and buffer depth figures for monitoring"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['depth'] = len(self._pending)
+        total_ms = stats.pop('total_flush_ms')
+        stats['avg_flush_ms'] = round(total_ms / stats['flushes'], 2) if stats['flushes'] else None
+        return stats
+
+    def _ensure_flusher(self):
+        if self._flusher is not None and self._flusher.is_alive():
+            return
+        with self._lock:
+            if self._flusher is None or not self._flusher.is_alive():
+                self._flusher = threading.Thread(target=self._flush_loop, name='smoke-writer', daemon=True)
+                self._flusher.start()
+
+    def _flush_loop(self):
+        """Flush batches that have waited flush_ms without filling up"""
+        interval = self.flush_ms / 1000
+        while True:
+            time.sleep(interval / 4)
+            with self._lock:
+                due = self._first_added is not None and time.monotonic() - self._first_added >= interval
+            if due:
+                self.flush()
+
+
+smoke_write_buffer = SmokeWriteBuffer()
+
+# Write whatever is still buffered when the process exits normally
+atexit.register(smoke_write_buffer.flush)
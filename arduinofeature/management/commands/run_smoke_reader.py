@@ -0,0 +1,32 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from arduinofeature.buffer import smoke_write_buffer
+from arduinofeature.reader import SmokeReader, smoke_ports
+
+
+class Command(BaseCommand):
+    help = 'Read the smoke sensor continuously, storing every reading as SmokeData'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', action='append', dest='ports',
+                            help='Serial port to use; may be repeated (default ARDUINO_COM_PORT, then COM4-COM6)')
+        parser.add_argument('--baudrate', type=int, default=9600)
+
+    def handle(self, *args, **options):
+        # Stop cleanly on SIGTERM too, so buffered readings are written
+        signal.signal(signal.SIGTERM, lambda signum, frame: self._interrupt())
+        reader = SmokeReader(ports=options['ports'] or smoke_ports(), baudrate=options['baudrate'])
+        reader.start()
+        self.stdout.write(f"Reading smoke sensor from {', '.join(reader.ports)}; press Ctrl+C to stop")
+        try:
+            while reader.is_alive():
+                reader.join(1)
+        except KeyboardInterrupt:
+            reader.stop(timeout=5)
+        smoke_write_buffer.flush()
+        self.stdout.write(f"Smoke writes: {smoke_write_buffer.metrics()}")
+
+    def _interrupt(self):
+        raise KeyboardInterrupt
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('arduinofeature', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='smokedata',
+            index=models.Index(fields=['timestamp', 'smoke_level'], name='arduinofeat_timesta_f5206e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='smokedata',
+            index=models.Index(fields=['status'], name='arduinofeat_status_122149_idx'),
+        ),
+    ]
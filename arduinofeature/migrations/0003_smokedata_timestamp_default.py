@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('arduinofeature', '0002_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='smokedata',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
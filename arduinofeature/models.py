@@ -1,9 +1,11 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 
 class SmokeData(models.Model):
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the reading is taken; buffered readings are written later
+    timestamp = models.DateTimeField(default=timezone.now)
     smoke_level = models.IntegerField()
     status = models.CharField(max_length=20, choices=[
         ('safe', 'Safe'),
@@ -13,6 +15,11 @@ class SmokeData(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Covers the time-range statistics without reading table rows
+            models.Index(fields=['timestamp', 'smoke_level']),
+            models.Index(fields=['status']),
+        ]
 
     def __str__(self):
         return f"Smoke Level: {self.smoke_level} PPM at {self.timestamp}"
@@ -0,0 +1,141 @@
+import logging
+import os
+import re
+import threading
+from collections import deque
+
+import serial
+from django.conf import settings
+from django.utils import timezone
+
+from .buffer import smoke_write_buffer
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before trying the serial ports again after a failure
+RECONNECT_DELAY = 5
+
+_NUMBER_RE = re.compile(r'\d+')
+
+_reader = None
+_reader_lock = threading.Lock()
+
+
+def smoke_ports():
+    """Serial ports to try, the configured one first"""
+    return [os.getenv('ARDUINO_COM_PORT', 'COM3'), 'COM4', 'COM5', 'COM6']
+
+
+def parse_smoke_level(line):
+    """Return the smoke level in a line from the sensor, or None if it has none.
+
+    Accepts "Smoke: 123", any other "prefix: 123", a bare number, or the
+    first number found anywhere in the line.
+    """
+    if ':' in line:
+        value = line.split(':')[1].strip()
+        if value.isdigit():
+            return int(value)
+    numbers = _NUMBER_RE.findall(line)
+    return int(numbers[0]) if numbers else None
+
+
+def smoke_status(smoke_level):
+    if smoke_level < 230:
+        return 'safe'
+    if smoke_level < 500:
+        return 'warning'
+    return 'danger'
+
+
+class SmokeReader(threading.Thread):
+    """Reads the smoke sensor continuously into an in-memory ring buffer.
+
+    Requests read `latest` or `recent()` instead of touching the serial
+    port, so they never wait on the sensor or race each other for it. Every
+    valid reading is also queued on the SmokeData write buffer.
+    """
+
+    def __init__(self, ports=None, baudrate=9600, buffer_size=None):
+        super().__init__(name='smoke-reader', daemon=True)
+        self.ports = ports or smoke_ports()
+        self.baudrate = baudrate
+        self.readings = deque(maxlen=buffer_size or getattr(settings, 'SMOKE_READER_BUFFER_SIZE', 600))
+        self.latest = None
+        self.port = None
+        self._serial = None
+        self._stop_event = threading.Event()
+
+    def connect(self):
+        for port in self.ports:
+            try:
+                self._serial = serial.Serial(port, self.baudrate, timeout=1)
+                self.port = port
+                logger.info(f"Smoke reader connected to {port}")
+                return True
+            except Exception as e:
+                logger.debug(f"Could not open {port}: {e}")
+        return False
+
+    def disconnect(self):
+        if self._serial is not None:
+            try:
+                self._serial.close()
+            except Exception:
+                pass
+        self._serial = None
+        self.port = None
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if self._serial is None and not self.connect():
+                self._stop_event.wait(RECONNECT_DELAY)
+                continue
+            try:
+                line = self._serial.readline().decode('utf-8', errors='ignore').strip()
+            except Exception as e:
+                logger.warning(f"Smoke sensor read failed on {self.port}: {e}")
+                self.disconnect()
+                self._stop_event.wait(RECONNECT_DELAY)
+                continue
+
+            smoke_level = parse_smoke_level(line) if line else None
+            if smoke_level:
+                self.record(smoke_level)
+        self.disconnect()
+        smoke_write_buffer.flush()
+
+    def record(self, smoke_level):
+        """Publish a reading to memory and queue it for storage"""
+        reading = {
+            'smoke_level': smoke_level,
+            'status': smoke_status(smoke_level),
+            'timestamp': timezone.now(),
+        }
+        self.readings.append(reading)
+        self.latest = reading
+        smoke_write_buffer.add(smoke_level, reading['status'], reading['timestamp'])
+
+    def recent(self, limit=None):
+        """Buffered readings, oldest first"""
+        readings = list(self.readings)
+        return readings[-limit:] if limit else readings
+
+    def stop(self, timeout=None):
+        self._stop_event.set()
+        self.join(timeout)
+
+
+def get_reader():
+    """The reader running in this process, or None"""
+    return _reader if _reader is not None and _reader.is_alive() else None
+
+
+def start_reader(**kwargs):
+    """Start the process-wide reader if it is not already running"""
+    global _reader
+    with _reader_lock:
+        if get_reader() is None:
+            _reader = SmokeReader(**kwargs)
+            _reader.start()
+        return _reader
@@ -1,3 +1,66 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from utils.testing import QueryPlanAssertions
+from .buffer import SmokeWriteBuffer
+from .models import SmokeData
+
+
+class SmokeDataQueryPlanTests(QueryPlanAssertions, TestCase):
+    """Chart and alert queries must be answered from an index, not a table scan"""
+
+    def test_smoke_data(self):
+        since = timezone.now() - timedelta(hours=24)
+        recent = SmokeData.objects.filter(timestamp__range=(since, timezone.now()))
+        self.assertUsesIndex(recent.order_by('timestamp'))
+        self.assertUsesIndex(recent.values('smoke_level'))
+        self.assertUsesIndex(SmokeData.objects.filter(status='danger'))
+
+
+@mock.patch.object(SmokeWriteBuffer, '_ensure_flusher')
+class SmokeWriteBufferTests(TestCase):
+    """Readings are written in bulk once a batch fills up"""
+
+    def test_flushes_when_batch_is_full(self, ensure_flusher):
+        buffer = SmokeWriteBuffer(batch_size=3, flush_ms=60000)
+        taken_at = timezone.now() - timedelta(minutes=5)
+        with self.assertNumQueries(0):
+            for level in (10, 20):
+                buffer.add(level, 'safe', taken_at)
+
+        with self.assertNumQueries(1):
+            buffer.add(30, 'safe', taken_at)
+        self.assertEqual(sorted(SmokeData.objects.values_list('smoke_level', flat=True)), [10, 20, 30])
+        # Rows keep the time the reading was taken
+        self.assertFalse(SmokeData.objects.exclude(timestamp=taken_at).exists())
+        self.assertEqual(buffer.metrics()['rows_written'], 3)
+        self.assertEqual(buffer.metrics()['depth'], 0)
+
+    def test_failed_flush_keeps_rows(self, ensure_flusher):
+        buffer = SmokeWriteBuffer(batch_size=2, flush_ms=60000, max_pending=3)
+        with mock.patch.object(SmokeData.objects, 'bulk_create', side_effect=RuntimeError('locked')):
+            for level in (1, 2, 3, 4):
+                buffer.add(level, 'safe', timezone.now())
+        self.assertEqual(buffer.metrics()['depth'], 3)
+        self.assertEqual(buffer.metrics()['dropped'], 1)
+
+        self.assertEqual(buffer.flush(), 3)
+        self.assertEqual(sorted(SmokeData.objects.values_list('smoke_level', flat=True)), [2, 3, 4])
+
+
+class SmokeWriteBufferTimerTests(TransactionTestCase):
+    """A batch that never fills up is written by the background flusher"""
+
+    def test_flushes_after_flush_ms(self):
+        buffer = SmokeWriteBuffer(batch_size=100, flush_ms=50)
+        buffer.add(42, 'warning', timezone.now())
+        deadline = time.monotonic() + 5
+        while buffer.metrics()['rows_written'] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(buffer.metrics()['rows_written'], 1)
+        self.assertEqual(list(SmokeData.objects.values_list('smoke_level', flat=True)), [42])
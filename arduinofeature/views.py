@@ -1,35 +1,40 @@
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.db.models import Avg
+from django.db.models import Avg, Count, Max, Min, Q
 from django.db.models.functions import TruncHour
 from django.utils import timezone
 from datetime import datetime, timedelta
-import serial
 import json
 import os
 import requests
 from django.conf import settings
+from .buffer import smoke_write_buffer
 from .models import SmokeData
+from .reader import get_reader
 
-# Global variable to store the serial connection
-arduino_serial = None
+# Readings beyond this many are sampled down for the charts
+CHART_MAX_POINTS = 500
 
-def initialize_serial():
-    global arduino_serial
-    # Try to get COM port from environment variable, default to COM3
-    com_ports = [os.getenv('ARDUINO_COM_PORT', 'COM3')]
-    # Add common COM ports to try
-    com_ports.extend(['COM4', 'COM5', 'COM6'])
-    
-    for port in com_ports:
-        try:
-            if arduino_serial is None:
-                arduino_serial = serial.Serial(port, 9600, timeout=1)
-                print(f"Successfully connected to {port}")
-                break
-        except Exception as e:
-            print(f"Error trying to connect to {port}: {e}")
-            continue
+def smoke_stats(data_points):
+    """Average, range and per-status counts of smoke readings in one query"""
+    stats = data_points.aggregate(
+        avg=Avg('smoke_level'),
+        min=Min('smoke_level'),
+        max=Max('smoke_level'),
+        count=Count('id'),
+        safe_count=Count('id', filter=Q(status='safe')),
+        warning_count=Count('id', filter=Q(status='warning')),
+        danger_count=Count('id', filter=Q(status='danger')),
+    )
+    stats['avg'] = round(stats['avg'] or 0, 1)
+    stats['min'] = stats['min'] or 0
+    stats['max'] = stats['max'] or 0
+    return stats
+
+def sample_points(data_points, total_points):
+    """Every step-th reading, read in one pass, so at most about CHART_MAX_POINTS remain"""
+    step = max(1, total_points // CHART_MAX_POINTS)
+    return [data for i, data in enumerate(data_points.iterator()) if i % step == 0]
 
 def landing_page(request):
     return render(request, 'arduinofeature/landing.html')
@@ -38,84 +43,17 @@ def smoke_monitor(request):
     return render(request, 'arduinofeature/smoke_monitor.html')
 
 def get_smoke_data(request):
-    global arduino_serial
-    
-    try:
-        if arduino_serial is None:
-            initialize_serial()
-            
-        if arduino_serial and arduino_serial.is_open:
-            # Read the line from Arduino
-            line = arduino_serial.readline().decode('utf-8').strip()
-            print(f"Raw data from Arduino: {line}")  # Debug print
-            
-            # Parse the smoke value - handle various formats
-            smoke_value = 0
-            if line.startswith("Smoke:"):
-                # Standard format: "Smoke: 123"
-                try:
-                    smoke_value = int(line.split(":")[1].strip())
-                except:
-                    print("Error parsing standard format")
-            elif ":" in line:
-                # Alternative format: "e: 123" or any other prefix with colon
-                try:
-                    smoke_value = int(line.split(":")[1].strip())
-                except:
-                    print("Error parsing alternative format")
-            elif line.isdigit():
-                # Just a number
-                try:
-                    smoke_value = int(line)
-                except:
-                    print("Error parsing numeric format")
-            else:
-                # Try to extract any number from the string
-                import re
-                numbers = re.findall(r'\d+', line)
-                if numbers:
-                    try:
-                        smoke_value = int(numbers[0])
-                    except:
-                        print("Error parsing extracted number")
-                else:
-                    # No valid number found, use latest data from database
-                    latest = SmokeData.objects.order_by('-timestamp').first()
-                    if latest:
-                        smoke_value = latest.smoke_level
-                        print(f"Using latest database value: {smoke_value}")
-            
-            print(f"Parsed smoke value: {smoke_value}")  # Debug print
-            
-            # Determine status based on smoke level
-            if smoke_value < 230:
-                status = 'Safe'
-            elif smoke_value < 500:
-                status = 'Warning'
-            else:
-                status = 'Danger'
-            
-            print(f"Determined status: {status}")  # Debug print
-            
-            # Store the data if we have a valid smoke value
-            if smoke_value > 0:
-                smoke_data = SmokeData.objects.create(
-                    smoke_level=smoke_value,
-                    status=status.lower()
-                )
-                print(f"Stored data in database: {smoke_data}")  # Debug print
-            
-            # Return all necessary data
-            return JsonResponse({
-                'smoke_level': smoke_value,
-                'status': status,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            })
-            
-    except Exception as e:
-        print(f"Error reading from serial: {e}")  # Debug print
+    # The background reader keeps the latest reading in memory
+    reader = get_reader()
+    reading = reader.latest if reader else None
+    if reading:
+        return JsonResponse({
+            'smoke_level': reading['smoke_level'],
+            'status': reading['status'].capitalize(),
+            'timestamp': timezone.localtime(reading['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
+        })
     
-    # Return most recent data from database if available
+    # Without a reader in this process, readings are stored by run_smoke_reader
     try:
         latest = SmokeData.objects.order_by('-timestamp').first()
         if latest:
@@ -141,6 +79,16 @@ def get_smoke_data(request):
         'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     })
 
+def smoke_metrics(request):
+    """Reader and write-buffer health: buffer depth and bulk insert latency"""
+    reader = get_reader()
+    return JsonResponse({
+        'reader_running': reader is not None,
+        'port': reader.port if reader else None,
+        'buffered_readings': len(reader.readings) if reader else 0,
+        'writes': smoke_write_buffer.metrics(),
+    })
+
 def get_chart_data(request):
     # Get the time range from request or default to last 10 minutes
     time_range = request.GET.get('range', '10m')
@@ -174,25 +122,13 @@ def get_chart_data(request):
     ).order_by('timestamp')
     
     # Calculate statistics
-    stats = {
-        'avg': round(data_points.aggregate(Avg('smoke_level'))['smoke_level__avg'] or 0, 1),
-        'min': data_points.order_by('smoke_level').first().smoke_level if data_points.exists() else 0,
-        'max': data_points.order_by('-smoke_level').first().smoke_level if data_points.exists() else 0,
-        'count': data_points.count(),
-        'safe_count': data_points.filter(status='safe').count(),
-        'warning_count': data_points.filter(status='warning').count(),
-        'danger_count': data_points.filter(status='danger').count(),
-    }
+    stats = smoke_stats(data_points)
 
     # Format data for the chart, with special handling for large datasets
-    if time_range == 'all' and data_points.count() > 500:
+    if time_range == 'all' and stats['count'] > CHART_MAX_POINTS:
         # If there are too many points, sample the data to prevent browser performance issues
-        sample_size = 500
-        total_points = data_points.count()
-        step = max(1, total_points // sample_size)
-        
-        # Sample the data
-        sampled_points = [data_points[i] for i in range(0, total_points, step)]
+        total_points = stats['count']
+        sampled_points = sample_points(data_points, total_points)
         
         chart_data = {
             'labels': [data.timestamp.strftime('%Y-%m-%d %H:%M') for data in sampled_points],
@@ -243,30 +179,19 @@ def graphical_data(request):
         timestamp__range=(start_time, end_time)
     ).order_by('timestamp')
     
-    # Get total count of records for information
-    total_count = SmokeData.objects.count()
+    # Get total count of records for information; the whole table is
+    # already covered by the range when showing all data
+    total_count = None if time_range == 'all' else SmokeData.objects.count()
     
     # Calculate statistics
-    stats = {
-        'avg': round(data_points.aggregate(Avg('smoke_level'))['smoke_level__avg'] or 0, 1),
-        'min': data_points.order_by('smoke_level').first().smoke_level if data_points.exists() else 0,
-        'max': data_points.order_by('-smoke_level').first().smoke_level if data_points.exists() else 0,
-        'count': data_points.count(),
-        'total_count': total_count,  # Add total count to stats
-        'safe_count': data_points.filter(status='safe').count(),
-        'warning_count': data_points.filter(status='warning').count(),
-        'danger_count': data_points.filter(status='danger').count(),
-    }
+    stats = smoke_stats(data_points)
+    stats['total_count'] = stats['count'] if total_count is None else total_count
     
     # Sample the data if there are too many points for initial load
-    if time_range == 'all' and data_points.count() > 500:
+    if time_range == 'all' and stats['count'] > CHART_MAX_POINTS:
         # If there are too many points, sample the data to prevent browser performance issues
-        sample_size = 500
-        total_points = data_points.count()
-        step = max(1, total_points // sample_size)
-        
-        # Sample the data
-        sampled_points = [data_points[i] for i in range(0, total_points, step)]
+        total_points = stats['count']
+        sampled_points = sample_points(data_points, total_points)
         
         chart_data = {
             'labels': [data.timestamp.strftime('%Y-%m-%d %H:%M') for data in sampled_points],
@@ -312,20 +237,18 @@ def get_ai_suggestions(request):
             timestamp__range=(start_time, end_time)
         ).order_by('-timestamp')
         
-        # Calculate average smoke level
-        avg_smoke_level = smoke_data.aggregate(Avg('smoke_level'))['smoke_level__avg']
-        if avg_smoke_level is None:
-            avg_smoke_level = 0
-        avg_smoke_level = round(avg_smoke_level, 1)
+        # Calculate average smoke level and status counts
+        stats = smoke_stats(smoke_data)
+        avg_smoke_level = stats['avg']
         
         # Get most common status
         status_counts = {
-            'safe': smoke_data.filter(status='safe').count(),
-            'warning': smoke_data.filter(status='warning').count(),
-            'danger': smoke_data.filter(status='danger').count()
+            'safe': stats['safe_count'],
+            'warning': stats['warning_count'],
+            'danger': stats['danger_count']
         }
         
-        most_common_status = max(status_counts, key=status_counts.get) if smoke_data.exists() else 'unknown'
+        most_common_status = max(status_counts, key=status_counts.get) if stats['count'] else 'unknown'
         
         # Get the hourly trend to see if air quality is improving or worsening
         hourly_data = smoke_data.annotate(
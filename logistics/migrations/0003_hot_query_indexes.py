@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logistics', '0002_metroconstructionupdate_projectbottleneck_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'start_date'], name='logistics_p_status_cfa996_idx'),
+        ),
+    ]
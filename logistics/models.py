@@ -44,6 +44,9 @@ class Project(models.Model):
     
     class Meta:
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['status', 'start_date']),
+        ]
     
     def __str__(self):
         return f"{self.project_id} - {self.project_name}"
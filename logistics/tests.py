@@ -1,3 +1,11 @@
 from django.test import TestCase
 
-# Create your tests here.
+from utils.testing import QueryPlanAssertions
+from .models import Project
+
+
+class ProjectQueryPlanTests(QueryPlanAssertions, TestCase):
+    """Project listings must be answered from an index, not a table scan"""
+
+    def test_projects_by_status(self):
+        self.assertUsesIndex(Project.objects.filter(status='Ongoing'))
@@ -1,3 +1,21 @@
 from django.contrib import admin
+from .models import ComplaintDailyStats, ComplaintStatusEvent, EmailOutbox
 
 # Register your models here.
+
+@admin.register(ComplaintDailyStats)
+class ComplaintDailyStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'complaint_type', 'status', 'count')
+    list_filter = ('status', 'complaint_type', 'date')
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ('to_email', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    search_fields = ('to_email', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+
+@admin.register(ComplaintStatusEvent)
+class ComplaintStatusEventAdmin(admin.ModelAdmin):
+    list_display = ('complaint', 'from_status', 'to_status', 'changed_by', 'created_at')
+    list_filter = ('to_status', 'complaint_type', 'created_at')
@@ -0,0 +1,137 @@
+import math
+from collections import Counter
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from .models import AnalyticsCursor, ComplaintBacklogDelta, ComplaintResolution, ComplaintStatusEvent
+
+OPEN_STATUSES = ('PENDING', 'IN_PROGRESS')
+
+
+class ResolutionAnalytics:
+    """Resolution-time percentiles and open-backlog series from the status event log.
+
+    Each refresh only reads events newer than the cursor stored in the
+    database, folding them into one ComplaintResolution row per resolved
+    complaint and per-day ComplaintBacklogDelta rows. The state is shared
+    by every worker and survives restarts, and the complaints table is
+    never scanned.
+    """
+
+    name = 'resolution'
+
+    def __init__(self, batch_size=5000):
+        self.batch_size = batch_size
+
+    def reset(self):
+        """Drop the folded state so the next refresh rebuilds it from the whole log"""
+        with transaction.atomic():
+            ComplaintResolution.objects.all().delete()
+            ComplaintBacklogDelta.objects.all().delete()
+            AnalyticsCursor.objects.filter(name=self.name).delete()
+
+    def refresh(self):
+        """Fold any new events into the stored totals"""
+        AnalyticsCursor.objects.get_or_create(name=self.name)
+        while True:
+            with transaction.atomic():
+                # The locked cursor keeps two workers from folding the same events
+                cursor = AnalyticsCursor.objects.select_for_update().get(name=self.name)
+                events = list(
+                    ComplaintStatusEvent.objects.filter(id__gt=cursor.last_event_id).order_by('id')
+                    .values_list('id', 'complaint_id', 'from_status', 'to_status',
+                                 'complaint_created_at', 'created_at')
+                    [:self.batch_size]
+                )
+                if not events:
+                    return
+                self._apply(events)
+                cursor.last_event_id = events[-1][0]
+                cursor.save(update_fields=['last_event_id'])
+            if len(events) < self.batch_size:
+                return
+
+    def _apply(self, events):
+        backlog = Counter()
+        # complaint id -> (hours, resolved_at) of its latest resolution, or None once reopened or deleted
+        resolutions = {}
+        for _, complaint_id, from_status, to_status, complaint_created_at, created_at in events:
+            was_open = from_status in OPEN_STATUSES
+            is_open = to_status in OPEN_STATUSES
+            if was_open != is_open:
+                backlog[timezone.localdate(created_at)] += 1 if is_open else -1
+
+            if complaint_id is None:
+                continue
+            if to_status == 'RESOLVED':
+                hours = max(0.0, (created_at - complaint_created_at).total_seconds() / 3600)
+                resolutions[complaint_id] = (hours, created_at)
+            elif to_status == 'DELETED' or (from_status == 'RESOLVED' and is_open):
+                # Reopened or deleted complaints no longer count as resolved
+                resolutions[complaint_id] = None
+
+        for day, delta in backlog.items():
+            self._adjust_backlog(day, delta)
+
+        ComplaintResolution.objects.filter(complaint_id__in=list(resolutions)).delete()
+        ComplaintResolution.objects.bulk_create([
+            ComplaintResolution(complaint_id=complaint_id, hours=resolution[0], resolved_at=resolution[1])
+            for complaint_id, resolution in resolutions.items() if resolution is not None
+        ], batch_size=1000)
+
+    @staticmethod
+    def _adjust_backlog(day, delta):
+        rows = ComplaintBacklogDelta.objects.filter(date=day)
+        if rows.update(delta=F('delta') + delta):
+            return
+        try:
+            with transaction.atomic():
+                ComplaintBacklogDelta.objects.create(date=day, delta=delta)
+        except IntegrityError:
+            rows.update(delta=F('delta') + delta)
+
+    def percentile(self, p, resolved=None):
+        """Return the resolution time in hours below which p percent of resolutions fall"""
+        resolved = ComplaintResolution.objects.count() if resolved is None else resolved
+        if not resolved:
+            return None
+        index = max(math.ceil(resolved * p / 100), 1) - 1
+        hours = ComplaintResolution.objects.order_by('hours').values_list('hours', flat=True)[index]
+        return round(hours, 2)
+
+    def backlog_series(self, days=30):
+        """Return [(date, open_complaints)] at the end of each of the last `days` days"""
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        deltas = ComplaintBacklogDelta.objects
+        open_count = deltas.filter(date__lt=start).aggregate(total=Sum('delta'))['total'] or 0
+        by_day = dict(deltas.filter(date__gte=start, date__lte=end).values_list('date', 'delta'))
+
+        series = []
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            open_count += by_day.get(day, 0)
+            series.append((day, open_count))
+        return series
+
+    def summary(self, days=30):
+        self.refresh()
+        resolved = ComplaintResolution.objects.count()
+        return {
+            'resolved_count': resolved,
+            'resolution_hours': {
+                'p50': self.percentile(50, resolved),
+                'p90': self.percentile(90, resolved),
+                'p95': self.percentile(95, resolved),
+            },
+            'backlog': [
+                {'date': day.isoformat(), 'open': count}
+                for day, count in self.backlog_series(days)
+            ],
+        }
+
+
+resolution_analytics = ResolutionAnalytics()
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ManagerConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'manager'
+
+    def ready(self):
+        # Keep the complaint rollups in step with the complaints table
+        from . import signals  # noqa: F401
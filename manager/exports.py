@@ -0,0 +1,101 @@
+import csv
+import tempfile
+
+from django.utils import timezone
+
+from .services import complaint_ordering, filter_complaint_queryset
+
+EXPORT_COLUMNS = [
+    ('ID', 'id'),
+    ('Title', 'title'),
+    ('Type', 'complaint_type'),
+    ('Status', 'status'),
+    ('Description', 'description'),
+    ('Latitude', 'latitude'),
+    ('Longitude', 'longitude'),
+    ('Submitted By', 'user__username'),
+    ('Created At', 'created_at'),
+    ('Updated At', 'updated_at'),
+]
+
+# Rows fetched from the database cursor at a time
+EXPORT_CHUNK_SIZE = 2000
+
+# Leading characters that make a spreadsheet treat a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+class Echo:
+    """File-like object whose write() hands back the value, for streaming csv rows"""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(params):
+    """Yield tuples of complaint fields matching the manager filters.
+
+    Rows are read through a server-side iterator, so memory use does not
+    grow with the number of complaints exported.
+    """
+    sort, ordering = complaint_ordering(params.get('sort'))
+    complaints = filter_complaint_queryset(params).order_by(*ordering)
+    return complaints.values_list(*[field for _, field in EXPORT_COLUMNS]).iterator(
+        chunk_size=EXPORT_CHUNK_SIZE
+    )
+
+
+def safe_cell(value):
+    """Quote user text that a spreadsheet would otherwise run as a formula"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def _local(value):
+    return timezone.localtime(value).replace(tzinfo=None)
+
+
+def stream_csv(params):
+    """Return an iterator over the CSV export, one encoded line at a time.
+
+    The filters are checked before anything is streamed, so a bad value
+    raises ValueError here rather than part way through the response.
+    """
+    return _csv_lines(export_rows(params))
+
+
+def _csv_lines(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        row = [safe_cell(value) for value in row]
+        row[-2] = _local(row[-2]).strftime('%Y-%m-%d %H:%M:%S')
+        row[-1] = _local(row[-1]).strftime('%Y-%m-%d %H:%M:%S')
+        yield writer.writerow(row)
+
+
+def write_xlsx(params):
+    """Write the export to an anonymous temporary file and return it, rewound.
+
+    Uses openpyxl's write-only mode, which streams rows to disk instead of
+    keeping the sheet in memory. Raises ImportError if openpyxl is missing.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    # Checks the filters before any worksheet is opened
+    rows = export_rows(params)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Complaints')
+    sheet.append([header for header, _ in EXPORT_COLUMNS])
+    for row in rows:
+        row = [safe_cell(ILLEGAL_CHARACTERS_RE.sub('', value)) if isinstance(value, str) else value for value in row]
+        row[-2] = _local(row[-2])
+        row[-1] = _local(row[-1])
+        sheet.append(row)
+
+    output = tempfile.TemporaryFile(suffix='.xlsx')
+    workbook.save(output)
+    output.seek(0)
+    return output
@@ -0,0 +1,139 @@
+import logging
+from bisect import bisect_right
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import Notification
+from utils.background import run_in_background
+from utils.emails import PreRenderedEmail
+from .geofence import Geofence
+from .models import NotificationJob
+from .outbox import enqueue_emails
+
+logger = logging.getLogger(__name__)
+
+FANOUT_CHUNK_SIZE = 1000
+
+
+def start_notification_job(job):
+    """Queue a job's fan-out on the background pool"""
+    return run_in_background(run_notification_job, job.id)
+
+
+def _recipient_chunks(job, chunk_size):
+    """Yield (users, cursor) chunks of the job's recipients after job.last_user_id.
+
+    Geofenced jobs resolve their recipient ids once through the profile
+    geohash index; other jobs walk the whole user table by primary key.
+    """
+    if job.geofence:
+        user_ids = Geofence.from_dict(job.geofence).select_user_ids()
+        yield len(user_ids)
+        start = bisect_right(user_ids, job.last_user_id)
+        for i in range(start, len(user_ids), chunk_size):
+            chunk_ids = user_ids[i:i + chunk_size]
+            users = list(User.objects.filter(pk__in=chunk_ids).order_by('pk').only('pk', 'username', 'email'))
+            yield users, chunk_ids[-1]
+        return
+
+    recipients = User.objects.order_by('pk')
+    yield recipients.count()
+    cursor = job.last_user_id
+    while True:
+        users = list(recipients.filter(pk__gt=cursor).only('pk', 'username', 'email')[:chunk_size])
+        if not users:
+            return
+        cursor = users[-1].pk
+        yield users, cursor
+
+
+def run_notification_job(job_id, chunk_size=FANOUT_CHUNK_SIZE):
+    """Deliver a broadcast to its recipients in chunks, recording progress.
+
+    Jobs backed by a Broadcast row are already visible in-app to everyone, so
+    only their emails are fanned out. Other jobs write each chunk of in-app
+    notifications with one bulk INSERT inside a transaction, and the job's
+    cursor moves forward with it, so a job that is interrupted can be run
+    again without duplicating notifications; see resume_notification_jobs.
+    """
+    job = NotificationJob.objects.get(pk=job_id)
+    if job.status == 'COMPLETED':
+        return job
+
+    chunks = _recipient_chunks(job, chunk_size)
+    job.status = 'RUNNING'
+    job.total_recipients = next(chunks)
+    job.save(update_fields=['status', 'total_recipients'])
+
+    # Geofenced notifications are pinned to the centre of their area
+    latitude, longitude = Geofence.from_dict(job.geofence).centre() if job.geofence else (None, None)
+
+    try:
+        email = prerender_job_email(job)
+        for users, cursor in chunks:
+            with transaction.atomic():
+                if job.broadcast_id is None:
+                    Notification.objects.bulk_create([
+                        Notification(
+                            user=user,
+                            title=job.title,
+                            message=job.message,
+                            notification_type=job.notification_type,
+                            latitude=latitude,
+                            longitude=longitude,
+                            is_read=False
+                        ) for user in users
+                    ])
+                # The chunk's emails commit with the cursor, so a resumed job
+                # neither loses nor repeats them
+                send_job_emails(job, users, email)
+                job.last_user_id = cursor
+                job.processed += len(users)
+                job.save(update_fields=['last_user_id', 'processed'])
+
+        job.status = 'COMPLETED'
+    except Exception as e:
+        logger.exception(f"Notification job {job.id} failed")
+        job.status = 'FAILED'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'finished_at'])
+    return job
+
+
+def resume_notification_jobs():
+    """Run every QUEUED or RUNNING job again from its last_user_id.
+
+    Jobs are left in those states when the process running them stops, so
+    this is meant to be run once after a restart. Returns the jobs resumed.
+    """
+    resumed = []
+    for job in NotificationJob.objects.filter(status__in=['QUEUED', 'RUNNING']).order_by('created_at'):
+        logger.info(f"Resuming notification job {job.id} after user {job.last_user_id}")
+        resumed.append(run_notification_job(job.id))
+    return resumed
+
+
+def prerender_job_email(job):
+    """Render the broadcast email once; only the recipient's name varies"""
+    context = {
+        'title': job.title,
+        'message': job.message,
+        'notification_type': job.notification_type,
+        'priority': job.priority,
+        'timestamp': job.created_at
+    }
+    return PreRenderedEmail('manager/emails/notification_alert.html', context)
+
+
+def send_job_emails(job, users, email=None):
+    """Queue this chunk's emails in the outbox with one bulk INSERT"""
+    email = email or prerender_job_email(job)
+    recipients = [user for user in users if user.email]
+    rendered = email.render_many(recipients)
+    enqueue_emails([
+        (user.email, f'Smart City Alert: {job.title}', html_message, plain_message)
+        for user, (html_message, plain_message) in zip(recipients, rendered)
+    ])
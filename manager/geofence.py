@@ -0,0 +1,95 @@
+import json
+
+from django.db.models import Q
+
+from users.models import UserProfile
+from utils.geo import (circle_bbox, geohash_cells_covering, geohash_range, haversine_km,
+                       point_in_polygon)
+
+
+class Geofence:
+    """A circle or polygon used to target a notification at part of the city.
+
+    Users are selected through the indexed UserProfile.geohash column: the
+    fence's bounding box is covered with a few geohash cells, each read as
+    an index range scan, and only those candidates get the exact test.
+    """
+
+    def __init__(self, shape, center=None, radius_km=None, polygon=None):
+        self.shape = shape
+        self.center = center
+        self.radius_km = radius_km
+        self.polygon = polygon
+
+    @classmethod
+    def from_dict(cls, data):
+        if data['shape'] == 'circle':
+            return cls('circle', center=tuple(data['center']), radius_km=data['radius_km'])
+        return cls('polygon', polygon=[tuple(point) for point in data['polygon']])
+
+    def to_dict(self):
+        if self.shape == 'circle':
+            return {'shape': 'circle', 'center': list(self.center), 'radius_km': self.radius_km}
+        return {'shape': 'polygon', 'polygon': [list(point) for point in self.polygon]}
+
+    @classmethod
+    def from_post(cls, data):
+        """Build a geofence from the broadcast form, or None to target everyone.
+
+        Raises ValueError when the selected shape is incomplete or invalid.
+        """
+        target = data.get('target', 'all')
+        if target == 'circle':
+            try:
+                center = (float(data.get('center_lat')), float(data.get('center_lng')))
+                radius_km = float(data.get('radius_km'))
+            except (TypeError, ValueError):
+                raise ValueError('Circle targeting needs a centre latitude, longitude and radius')
+            if radius_km <= 0:
+                raise ValueError('Radius must be greater than zero')
+            return cls('circle', center=center, radius_km=radius_km)
+
+        if target == 'polygon':
+            try:
+                points = json.loads(data.get('polygon') or '')
+                polygon = [(float(lat), float(lng)) for lat, lng in points]
+            except (TypeError, ValueError):
+                raise ValueError('Polygon must be a JSON list of [latitude, longitude] points')
+            if len(polygon) < 3:
+                raise ValueError('Polygon needs at least three points')
+            return cls('polygon', polygon=polygon)
+
+        return None
+
+    def bbox(self):
+        if self.shape == 'circle':
+            return circle_bbox(self.center[0], self.center[1], self.radius_km)
+        lats = [lat for lat, lng in self.polygon]
+        lngs = [lng for lat, lng in self.polygon]
+        return min(lats), min(lngs), max(lats), max(lngs)
+
+    def centre(self):
+        if self.shape == 'circle':
+            return self.center
+        south, west, north, east = self.bbox()
+        return (south + north) / 2, (west + east) / 2
+
+    def contains(self, latitude, longitude):
+        if self.shape == 'circle':
+            return haversine_km(self.center[0], self.center[1], latitude, longitude) <= self.radius_km
+        return point_in_polygon(latitude, longitude, self.polygon)
+
+    def select_user_ids(self):
+        """Return the sorted ids of users whose profile location is inside the fence"""
+        south, west, north, east = self.bbox()
+        cells = Q()
+        for cell in geohash_cells_covering(south, west, north, east):
+            low, high = geohash_range(cell)
+            cells |= Q(geohash__gte=low, geohash__lt=high)
+
+        candidates = UserProfile.objects.filter(cells).values_list('user_id', 'latitude', 'longitude')
+        return sorted(
+            user_id for user_id, latitude, longitude in candidates.iterator()
+            if south <= latitude <= north and west <= longitude <= east
+            and self.contains(latitude, longitude)
+        )
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from manager.outbox import drain_outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued emails from the EmailOutbox over pooled SMTP connections (run one worker only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='Emails sent per SMTP connection (default EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--rate', type=float, default=None,
+                            help='Maximum emails per second (default EMAIL_OUTBOX_RATE)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep polling the outbox instead of exiting when it is empty')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait between polls with --loop')
+
+    def handle(self, *args, **options):
+        while True:
+            sent = drain_outbox(batch_size=options['batch_size'], rate=options['rate'])
+            if sent:
+                self.stdout.write(f"Sent {sent} emails")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+from manager.models import ComplaintDailyStats
+from users.models import Complaint
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ComplaintDailyStats rollup from the complaints table'
+
+    def handle(self, *args, **options):
+        rows = (
+            Complaint.objects
+            .annotate(date=TruncDate('created_at'))
+            .values('date', 'status', 'complaint_type')
+            .annotate(count=Count('id'))
+            .order_by()
+        )
+        stats = [ComplaintDailyStats(**row) for row in rows]
+
+        with transaction.atomic():
+            ComplaintDailyStats.objects.all().delete()
+            ComplaintDailyStats.objects.bulk_create(stats, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(stats)} complaint stats rows"))
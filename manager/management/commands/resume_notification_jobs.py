@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from manager.fanout import resume_notification_jobs
+
+
+class Command(BaseCommand):
+    help = 'Finish notification jobs left QUEUED or RUNNING when the server stopped'
+
+    def handle(self, *args, **options):
+        jobs = resume_notification_jobs()
+        for job in jobs:
+            self.stdout.write(f"Job {job.id}: {job.status}")
+        self.stdout.write(self.style.SUCCESS(f"Resumed {len(jobs)} notification jobs"))
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:28
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def backfill_stats(apps, schema_editor):
+    """Count the complaints that already exist, as rebuild_complaint_stats does.
+
+    Without this the dashboard reads an empty rollup, and moving an older
+    complaint to a new status drives its day's counts negative.
+    """
+    Complaint = apps.get_model('users', 'Complaint')
+    ComplaintDailyStats = apps.get_model('manager', 'ComplaintDailyStats')
+    if ComplaintDailyStats.objects.exists():
+        return
+
+    rows = (
+        Complaint.objects
+        .annotate(date=TruncDate('created_at'))
+        .values('date', 'status', 'complaint_type')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    ComplaintDailyStats.objects.bulk_create([ComplaintDailyStats(**row) for row in rows], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('users', '0002_complaint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('RESOLVED', 'Resolved')], max_length=20)),
+                ('complaint_type', models.CharField(choices=[('POTHOLE', 'Pothole'), ('WATER_LEAK', 'Water Leak'), ('BROKEN_SIGNAL', 'Broken Signal'), ('GARBAGE', 'Garbage'), ('OTHER', 'Other')], max_length=20)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'complaint daily stats',
+                'ordering': ['-date'],
+                'unique_together': {('date', 'status', 'complaint_type')},
+            },
+        ),
+        migrations.RunPython(backfill_stats, migrations.RunPython.noop),
+    ]
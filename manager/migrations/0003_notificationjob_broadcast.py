@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0002_notificationjob'),
+        ('users', '0005_broadcast_broadcastread'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationjob',
+            name='broadcast',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to='users.broadcast'),
+        ),
+    ]
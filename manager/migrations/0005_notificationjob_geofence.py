@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0004_emailoutbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationjob',
+            name='geofence',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0006_reportjob'),
+        ('users', '0008_hot_query_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_type', models.CharField(choices=[('POTHOLE', 'Pothole'), ('WATER_LEAK', 'Water Leak'), ('BROKEN_SIGNAL', 'Broken Signal'), ('GARBAGE', 'Garbage'), ('OTHER', 'Other')], max_length=20)),
+                ('complaint_created_at', models.DateTimeField()),
+                ('from_status', models.CharField(blank=True, choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('RESOLVED', 'Resolved'), ('DELETED', 'Deleted')], max_length=20)),
+                ('to_status', models.CharField(choices=[('PENDING', 'Pending'), ('IN_PROGRESS', 'In Progress'), ('RESOLVED', 'Resolved'), ('DELETED', 'Deleted')], max_length=20)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='complaint_status_events', to=settings.AUTH_USER_MODEL)),
+                ('complaint', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='status_events', to='users.complaint')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+    ]
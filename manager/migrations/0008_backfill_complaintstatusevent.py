@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+def backfill_events(apps, schema_editor):
+    """Reconstruct a minimal history for complaints created before the log.
+
+    Each complaint gets a creation event at created_at; one that has moved
+    on from PENDING also gets a single transition at updated_at.
+    """
+    Complaint = apps.get_model('users', 'Complaint')
+    ComplaintStatusEvent = apps.get_model('manager', 'ComplaintStatusEvent')
+    if ComplaintStatusEvent.objects.exists():
+        return
+
+    batch = []
+    for complaint in Complaint.objects.order_by('created_at').iterator():
+        common = dict(
+            complaint_id=complaint.id,
+            complaint_type=complaint.complaint_type,
+            complaint_created_at=complaint.created_at,
+        )
+        batch.append(ComplaintStatusEvent(from_status='', to_status='PENDING',
+                                          created_at=complaint.created_at, **common))
+        if complaint.status != 'PENDING':
+            batch.append(ComplaintStatusEvent(from_status='PENDING', to_status=complaint.status,
+                                              created_at=complaint.updated_at, **common))
+        if len(batch) >= 1000:
+            ComplaintStatusEvent.objects.bulk_create(batch)
+            batch = []
+    ComplaintStatusEvent.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0007_complaintstatusevent'),
+        ('users', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_events, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    """Keep only the newest active job per key so the constraint can be added"""
+    ReportJob = apps.get_model('manager', 'ReportJob')
+    seen = set()
+    duplicates = []
+    for job_id, key in (ReportJob.objects.filter(status__in=['QUEUED', 'RUNNING'])
+                        .order_by('-created_at', '-id').values_list('id', 'key')):
+        if key in seen:
+            duplicates.append(job_id)
+        seen.add(key)
+    ReportJob.objects.filter(id__in=duplicates).update(
+        status='FAILED', error='Superseded by a newer job for the same report',
+        finished_at=django.utils.timezone.now(),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0008_backfill_complaintstatusevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='reportjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['QUEUED', 'RUNNING'])), fields=('key',), name='unique_active_report_job'),
+        ),
+    ]
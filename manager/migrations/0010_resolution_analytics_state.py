@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-19 05:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0009_reportjob_updated_at_active_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ComplaintBacklogDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('delta', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ComplaintResolution',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('complaint_id', models.BigIntegerField(unique=True)),
+                ('hours', models.FloatField(db_index=True)),
+                ('resolved_at', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-19 05:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('manager', '0010_resolution_analytics_state'),
+        ('users', '0010_complaint_duplicates'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='complaintstatusevent',
+            name='complaint',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='status_events', to='users.complaint'),
+        ),
+    ]
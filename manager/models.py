@@ -1,3 +1,248 @@
-from django.db import models
+from django.contrib.auth.models import User
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from users.models import Complaint
 
 # Create your models here.
+
+class ComplaintDailyStats(models.Model):
+    """Rollup of complaint counts per creation day, current status and type.
+
+    Kept up to date incrementally so dashboards can sum a handful of rows
+    instead of scanning the complaints table.
+    """
+    date = models.DateField()
+    status = models.CharField(max_length=20, choices=Complaint.STATUS_CHOICES)
+    complaint_type = models.CharField(max_length=20, choices=Complaint.COMPLAINT_TYPES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('date', 'status', 'complaint_type')
+        ordering = ['-date']
+        verbose_name_plural = 'complaint daily stats'
+
+    def __str__(self):
+        return f"{self.date} {self.complaint_type} {self.status}: {self.count}"
+
+    @classmethod
+    def adjust(cls, date, status, complaint_type, delta):
+        """Atomically add delta to a rollup row, creating it if needed"""
+        rows = cls.objects.filter(date=date, status=status, complaint_type=complaint_type)
+        if rows.update(count=F('count') + delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(date=date, status=status, complaint_type=complaint_type, count=delta)
+        except IntegrityError:
+            # Another request created the row first
+            rows.update(count=F('count') + delta)
+
+    @classmethod
+    def record_created(cls, complaint):
+        cls.adjust(timezone.localdate(complaint.created_at), complaint.status, complaint.complaint_type, 1)
+
+    @classmethod
+    def record_deleted(cls, complaint):
+        cls.adjust(timezone.localdate(complaint.created_at), complaint.status, complaint.complaint_type, -1)
+
+    @classmethod
+    def record_transition(cls, complaint, old_status, new_status, old_type=None):
+        """Move a complaint's count from its old status (and type, if it changed) to the new ones"""
+        old_type = old_type or complaint.complaint_type
+        if old_status == new_status and old_type == complaint.complaint_type:
+            return
+        day = timezone.localdate(complaint.created_at)
+        with transaction.atomic():
+            cls.adjust(day, old_status, old_type, -1)
+            cls.adjust(day, new_status, complaint.complaint_type, 1)
+
+
+class NotificationJob(models.Model):
+    """A manager broadcast whose per-user fan-out runs outside the request"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    title = models.CharField(max_length=100)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20)
+    priority = models.CharField(max_length=20, default='normal')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='notification_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+    total_recipients = models.IntegerField(default=0)
+    processed = models.IntegerField(default=0)
+    # City-wide jobs point at a single Broadcast row and only fan out email
+    broadcast = models.ForeignKey('users.Broadcast', on_delete=models.SET_NULL, null=True, blank=True,
+                                  related_name='jobs')
+    # Optional circle or polygon (see manager.geofence); empty targets everyone
+    geofence = models.JSONField(null=True, blank=True)
+    # Highest user id already delivered to, so an interrupted job can resume
+    last_user_id = models.BigIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.title} ({self.status})"
+
+    @property
+    def progress(self):
+        if not self.total_recipients:
+            return 100 if self.status == 'COMPLETED' else 0
+        return min(100, round(self.processed * 100 / self.total_recipients))
+
+
+class EmailOutbox(models.Model):
+    """An outgoing email, delivered in batches by manager.outbox.drain_outbox"""
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('SENDING', 'Sending'),
+        ('SENT', 'Sent'),
+        ('DEAD', 'Dead'),
+    ]
+
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body_text = models.TextField()
+    body_html = models.TextField(blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.to_email}: {self.subject} ({self.status})"
+
+
+class ReportJob(models.Model):
+    """A PDF complaints report built in the background (see manager.reports)"""
+    STATUS_CHOICES = [
+        ('QUEUED', 'Queued'),
+        ('RUNNING', 'Running'),
+        ('COMPLETED', 'Completed'),
+        ('FAILED', 'Failed'),
+    ]
+
+    # Hash of the report filters and the data version it was built from
+    key = models.CharField(max_length=40, db_index=True)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='QUEUED')
+    progress = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='report_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped with every status or progress save; a stale value means the worker died
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    ACTIVE_STATUSES = ('QUEUED', 'RUNNING')
+
+    class Meta:
+        ordering = ['-created_at']
+        constraints = [
+            # At most one queued or running job builds each report
+            models.UniqueConstraint(fields=['key'], condition=models.Q(status__in=['QUEUED', 'RUNNING']),
+                                    name='unique_active_report_job'),
+        ]
+
+    def __str__(self):
+        return f"Report {self.key} ({self.status})"
+
+
+class ComplaintStatusEvent(models.Model):
+    """Append-only log of complaint status changes, read by manager.analytics.
+
+    Creation is logged with an empty from_status and deletion with a
+    to_status of DELETED. The complaint's type and creation time are copied
+    so that the log can be analysed without joining the complaints table.
+    """
+    STATUS_CHOICES = Complaint.STATUS_CHOICES + [
+        ('DELETED', 'Deleted'),
+    ]
+
+    # No database constraint and no cascade, so a complaint's events keep its
+    # id after it is deleted and the log is never rewritten
+    complaint = models.ForeignKey(Complaint, on_delete=models.DO_NOTHING, db_constraint=False,
+                                  null=True, blank=True, related_name='status_events')
+    complaint_type = models.CharField(max_length=20, choices=Complaint.COMPLAINT_TYPES)
+    complaint_created_at = models.DateTimeField()
+    from_status = models.CharField(max_length=20, choices=STATUS_CHOICES, blank=True)
+    to_status = models.CharField(max_length=20, choices=STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='complaint_status_events')
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f"Complaint {self.complaint_id}: {self.from_status or 'NEW'} -> {self.to_status}"
+
+    @classmethod
+    def build(cls, complaint, from_status, to_status, changed_by=None):
+        return cls(
+            complaint_id=complaint.pk,
+            complaint_type=complaint.complaint_type,
+            complaint_created_at=complaint.created_at,
+            from_status=from_status or '',
+            to_status=to_status,
+            changed_by=changed_by,
+        )
+
+    @classmethod
+    def record(cls, complaint, from_status, to_status, changed_by=None):
+        if from_status == to_status:
+            return None
+        event = cls.build(complaint, from_status, to_status, changed_by)
+        event.save()
+        return event
+
+
+class ComplaintResolution(models.Model):
+    """How long each resolved complaint took, kept by manager.analytics.
+
+    One row per complaint: resolving it again replaces the row and
+    reopening it removes the row, so only its last resolution counts.
+    """
+    complaint_id = models.BigIntegerField(unique=True)
+    hours = models.FloatField(db_index=True)
+    resolved_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Complaint {self.complaint_id} resolved in {self.hours:.1f}h"
+
+
+class ComplaintBacklogDelta(models.Model):
+    """Net change in open complaints on each day, kept by manager.analytics"""
+    date = models.DateField(unique=True)
+    delta = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.delta:+d}"
+
+
+class AnalyticsCursor(models.Model):
+    """Last ComplaintStatusEvent folded into a named set of analytics tables"""
+    name = models.CharField(max_length=50, unique=True)
+    last_event_id = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_event_id}"
@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+# Rows left in SENDING this long belong to a worker that died mid-batch. Slow
+# rates stretch it further, so a batch that is still sending is never reclaimed
+STALE_SENDING_AFTER = timedelta(minutes=10)
+
+_drain_lock = threading.Lock()
+# True while this process's drainer thread is alive; there is never more than one
+_drain_running = False
+# Set by schedule_drain so the drainer makes another pass before it exits
+_drain_requested = False
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across every thread in the process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self, rate):
+        if not rate:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + 1 / rate
+        time.sleep(slot - now)
+
+
+send_rate_limiter = RateLimiter()
+
+
+def enqueue_emails(emails):
+    """Queue many (to_email, subject, html_message, plain_message) tuples in one INSERT"""
+    rows = [
+        EmailOutbox(to_email=to_email, subject=subject[:255], body_text=plain_message,
+                    body_html=html_message or '')
+        for to_email, subject, html_message, plain_message in emails if to_email
+    ]
+    if rows:
+        EmailOutbox.objects.bulk_create(rows, batch_size=1000)
+        # Inside a transaction the rows are only visible to the drain once it commits
+        transaction.on_commit(schedule_drain)
+    return len(rows)
+
+
+def _send_rate(rate=None):
+    return rate if rate is not None else getattr(settings, 'EMAIL_OUTBOX_RATE', 10)
+
+
+def sending_timeout(batch_size, rate=None):
+    """How long a claimed batch may stay in SENDING before it is taken to be abandoned"""
+    rate = _send_rate(rate)
+    if not rate:
+        return STALE_SENDING_AFTER
+    # Twice the time the batch needs at the rate limit
+    return max(STALE_SENDING_AFTER, timedelta(seconds=2 * batch_size / rate))
+
+
+def claim_batch(batch_size, rate=None):
+    """Move up to batch_size due PENDING rows to SENDING and return them.
+
+    The status filter on the UPDATE means two workers never claim the same row.
+    """
+    now = timezone.now()
+    EmailOutbox.objects.filter(
+        status='SENDING', next_attempt_at__lt=now - sending_timeout(batch_size, rate)
+    ).update(status='PENDING')
+
+    ids = list(
+        EmailOutbox.objects.filter(status='PENDING', next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id').values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    EmailOutbox.objects.filter(id__in=ids, status='PENDING').update(status='SENDING', next_attempt_at=now)
+    return list(EmailOutbox.objects.filter(id__in=ids, status='SENDING', next_attempt_at=now))
+
+
+def _record_failure(email, error, max_attempts, retry_base):
+    email.attempts += 1
+    email.last_error = error
+    if email.attempts >= max_attempts:
+        email.status = 'DEAD'
+        logger.error(f"Email {email.id} to {email.to_email} dead-lettered after "
+                     f"{email.attempts} attempts: {error}")
+    else:
+        email.status = 'PENDING'
+        email.next_attempt_at = timezone.now() + timedelta(seconds=retry_base * 2 ** (email.attempts - 1))
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def send_batch(emails, rate=None, max_attempts=None, retry_base=None):
+    """Send claimed emails over a single SMTP connection.
+
+    Returns the number delivered. At most `rate` messages go out per second
+    from this process, however many batches are being sent at once.
+    Failed messages are retried with exponential backoff and dead-lettered
+    after `max_attempts`.
+    """
+    rate = _send_rate(rate)
+    max_attempts = max_attempts or getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+    retry_base = retry_base or getattr(settings, 'EMAIL_OUTBOX_RETRY_SECONDS', 60)
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Could not open email connection: {str(e)}")
+        for email in emails:
+            _record_failure(email, str(e), max_attempts, retry_base)
+        return 0
+
+    sent = 0
+    try:
+        for email in emails:
+            send_rate_limiter.wait(rate)
+            message = EmailMultiAlternatives(
+                subject=email.subject,
+                body=email.body_text,
+                from_email=None,  # Uses DEFAULT_FROM_EMAIL from settings
+                to=[email.to_email],
+                connection=connection,
+            )
+            if email.body_html:
+                message.attach_alternative(email.body_html, 'text/html')
+
+            try:
+                delivered = connection.send_messages([message])
+            except Exception as e:
+                _record_failure(email, str(e), max_attempts, retry_base)
+            else:
+                if delivered:
+                    email.status = 'SENT'
+                    email.sent_at = timezone.now()
+                    email.save(update_fields=['status', 'sent_at'])
+                    sent += 1
+                else:
+                    _record_failure(email, 'Message was not accepted', max_attempts, retry_base)
+
+    finally:
+        connection.close()
+    return sent
+
+
+def drain_outbox(batch_size=None, rate=None, max_batches=None):
+    """Deliver due outbox emails batch by batch until none are left"""
+    batch_size = batch_size or getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 100)
+    sent = batches = 0
+    while max_batches is None or batches < max_batches:
+        emails = claim_batch(batch_size, rate=rate)
+        if not emails:
+            break
+        sent += send_batch(emails, rate=rate)
+        batches += 1
+    if sent:
+        logger.info(f"Email outbox delivered {sent} emails in {batches} batches")
+    return sent
+
+
+def _drain_loop():
+    """Drain until no further drain was requested, then mark the drainer stopped"""
+    global _drain_running, _drain_requested
+    try:
+        while True:
+            with _drain_lock:
+                if not _drain_requested:
+                    _drain_running = False
+                    return
+                _drain_requested = False
+            try:
+                drain_outbox()
+            except Exception:
+                logger.exception("Email outbox drain failed")
+    finally:
+        connections.close_all()
+
+
+def schedule_drain():
+    """Make sure this process's outbox drainer runs once more.
+
+    Only one drainer thread runs per process and requests made while it is
+    busy are folded into a single extra pass. The rate limit is per process,
+    so this is only for single-process deployments: with several web
+    workers leave EMAIL_OUTBOX_AUTO_DRAIN off (the default) and run exactly
+    one `drain_email_outbox --loop` worker instead.
+    """
+    global _drain_running, _drain_requested
+    if not getattr(settings, 'EMAIL_OUTBOX_AUTO_DRAIN', False):
+        return
+    with _drain_lock:
+        _drain_requested = True
+        if _drain_running:
+            return
+        _drain_running = True
+    threading.Thread(target=_drain_loop, name='email-outbox', daemon=True).start()
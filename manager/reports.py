@@ -0,0 +1,233 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.html import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from utils.background import run_in_background
+from .models import ReportJob
+from .services import filter_complaint_queryset
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILTERS = ('type', 'status', 'date_from', 'date_to')
+# Most recent matching complaints listed in a report; use the CSV export for all
+REPORT_MAX_ROWS = 1000
+# Cached report files older than this are removed when a new report is built
+REPORT_MAX_AGE = 7 * 24 * 3600
+# Active jobs that have not saved any progress for this long are taken to have died
+REPORT_JOB_TIMEOUT = timedelta(minutes=10)
+
+HEADER_STYLE = [
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+]
+
+
+def report_params(params):
+    """Keep only the filters that affect a report, dropping empty ones"""
+    return {name: params.get(name) for name in REPORT_FILTERS if params.get(name)}
+
+
+def report_key(params):
+    """Hash the filters together with the version of the data they select.
+
+    The version is the newest updated_at and the row count of the matching
+    complaints, so any edit, addition or deletion produces a new key.
+    """
+    version = filter_complaint_queryset(params).aggregate(
+        last_updated=Max('updated_at'), count=Count('id')
+    )
+    payload = json.dumps([sorted(params.items()), version['last_updated'], version['count']], default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def reports_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'reports')
+
+
+def report_path(key):
+    return os.path.join(reports_dir(), f'{key}.pdf')
+
+
+def get_or_start_report(params, user=None):
+    """Return (path, job) for a report of the given filters.
+
+    When a report for the current data already exists on disk, path is set
+    and no job is started. Otherwise a live job for the same key is reused,
+    or a new one is queued on the background pool. A unique constraint on
+    active jobs keeps concurrent requests from starting two.
+    """
+    params = report_params(params)
+    key = report_key(params)
+    path = report_path(key)
+    if os.path.exists(path):
+        return path, None
+
+    with transaction.atomic():
+        fail_stale_report_jobs(key)
+        job, created = ReportJob.objects.get_or_create(
+            key=key, status__in=ReportJob.ACTIVE_STATUSES,
+            defaults={'params': params, 'created_by': user},
+        )
+        if created:
+            transaction.on_commit(lambda: run_in_background(run_report_job, job.id))
+    return None, job
+
+
+def fail_stale_report_jobs(key=None, timeout=REPORT_JOB_TIMEOUT):
+    """Mark active jobs with no progress within timeout as FAILED; return how many.
+
+    Their worker was lost, usually to a restart, and would otherwise block
+    the report for its key forever.
+    """
+    now = timezone.now()
+    stale = ReportJob.objects.filter(status__in=ReportJob.ACTIVE_STATUSES, updated_at__lt=now - timeout)
+    if key is not None:
+        stale = stale.filter(key=key)
+    return stale.update(status='FAILED', error='No progress before the job timed out',
+                        finished_at=now, updated_at=now)
+
+
+def run_report_job(job_id):
+    """Build the PDF for a ReportJob, recording progress as rows are gathered"""
+    job = ReportJob.objects.get(pk=job_id)
+    job.status = 'RUNNING'
+    job.save(update_fields=['status', 'updated_at'])
+
+    def set_progress(progress):
+        job.progress = progress
+        job.save(update_fields=['progress', 'updated_at'])
+
+    try:
+        build_report(job.params, report_path(job.key), set_progress)
+        job.status = 'COMPLETED'
+        job.progress = 100
+    except Exception as e:
+        logger.exception(f"Report job {job.id} failed")
+        job.status = 'FAILED'
+        job.error = str(e)
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'progress', 'error', 'updated_at', 'finished_at'])
+    prune_reports()
+    return job
+
+
+def build_report(params, path, set_progress=None):
+    """Write the complaints PDF for the given filters to path"""
+    set_progress = set_progress or (lambda progress: None)
+    complaints = filter_complaint_queryset(params)
+
+    elements = []
+    styles = getSampleStyleSheet()
+    title_style = styles['Heading1']
+    subtitle_style = styles['Heading2']
+
+    # Add title
+    elements.append(Paragraph('Complaints Report', title_style))
+    if params:
+        filters = ', '.join(f"{name.replace('_', ' ')}: {value}" for name, value in params.items())
+        elements.append(Paragraph(escape(f'Filters - {filters}'), styles['Normal']))
+    elements.append(Spacer(1, 20))
+
+    # Summary counts in a single query
+    summary = complaints.aggregate(
+        total=Count('id'),
+        pending=Count('id', filter=Q(status='PENDING')),
+        in_progress=Count('id', filter=Q(status='IN_PROGRESS')),
+        resolved=Count('id', filter=Q(status='RESOLVED')),
+    )
+    summary_data = [
+        ['Summary Statistics'],
+        ['Total Complaints', str(summary['total'])],
+        ['Pending Complaints', str(summary['pending'])],
+        ['In Progress Complaints', str(summary['in_progress'])],
+        ['Resolved Complaints', str(summary['resolved'])]
+    ]
+
+    summary_table = Table(summary_data)
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 14),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 12),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    elements.append(summary_table)
+    elements.append(Spacer(1, 20))
+
+    # Complaints by Type
+    elements.append(Paragraph('Complaints by Type', subtitle_style))
+    type_counts = complaints.values('complaint_type').annotate(count=Count('id')).order_by('-count')
+    type_data = [['Type', 'Count']]
+    type_data.extend([[t['complaint_type'], str(t['count'])] for t in type_counts])
+    type_table = Table(type_data)
+    type_table.setStyle(TableStyle(HEADER_STYLE))
+    elements.append(type_table)
+    elements.append(Spacer(1, 20))
+    set_progress(10)
+
+    # Most recent complaints
+    rows = min(summary['total'], REPORT_MAX_ROWS)
+    heading = 'Recent Complaints' if summary['total'] > rows else 'Complaints'
+    elements.append(Paragraph(heading, subtitle_style))
+    complaints_data = [['Title', 'Type', 'Status', 'Submitted By', 'Date']]
+    recent = complaints.order_by('-created_at').values_list(
+        'title', 'complaint_type', 'status', 'user__username', 'created_at'
+    )[:rows]
+    for i, (title, complaint_type, status, username, created_at) in enumerate(recent.iterator(), 1):
+        complaints_data.append([title, complaint_type, status, username, created_at.strftime('%Y-%m-%d %H:%M')])
+        if i % 200 == 0:
+            set_progress(10 + int(60 * i / rows))
+
+    complaints_table = Table(complaints_data, repeatRows=1)
+    complaints_table.setStyle(TableStyle(HEADER_STYLE))
+    elements.append(complaints_table)
+    set_progress(70)
+
+    # Build into a temporary file so readers never see a partial report
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=os.path.dirname(path))
+    os.close(fd)
+    try:
+        SimpleDocTemplate(tmp_path, pagesize=landscape(letter)).build(elements)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def prune_reports(max_age=REPORT_MAX_AGE):
+    """Delete cached report files that have not been rebuilt for max_age seconds"""
+    cutoff = time.time() - max_age
+    try:
+        entries = list(os.scandir(reports_dir()))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.name.endswith('.pdf') and entry.stat().st_mtime < cutoff:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,335 @@
+import hashlib
+import json
+import threading
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Substr
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.html import strip_tags
+
+from users.models import Complaint
+from utils.cache import dashboard_cache
+from .models import ComplaintDailyStats, ComplaintStatusEvent
+from .outbox import enqueue_emails
+
+_dashboard_lock = threading.Lock()
+
+COMPLAINT_PAGE_SIZE = 50
+COMPLAINT_MAX_PAGE_SIZE = 200
+# Matching rows are counted exactly up to this many; larger totals are
+# estimated from the ComplaintDailyStats rollup instead
+COMPLAINT_EXACT_COUNT_LIMIT = 10000
+# Sortable columns of the manager complaints table
+COMPLAINT_SORTS = {
+    'created_at': 'created_at',
+    'title': 'title',
+    'type': 'complaint_type',
+    'status': 'status',
+    'user': 'user__username',
+}
+# Most complaints a single bulk status update may change
+BULK_STATUS_MAX_IDS = 1000
+
+
+def calculate_trend(current, previous):
+    """Percentage change from previous to current"""
+    if previous == 0:
+        return 100 if current > 0 else 0
+    return round(((current - previous) / previous) * 100, 1)
+
+
+def get_dashboard_stats():
+    """Compute the manager dashboard counts and their trends.
+
+    Every complaint count, current and previous period, is summed from the
+    ComplaintDailyStats rollup in a single conditional-aggregation query, so
+    previous periods are cut at day granularity. Active users need one more
+    query because they are distinct users rather than complaints.
+    """
+    now = timezone.now()
+    last_month = now - timedelta(days=30)
+    last_week = now - timedelta(days=7)
+    two_months_ago = now - timedelta(days=60)
+    last_month_day = timezone.localdate(last_month)
+    last_week_day = timezone.localdate(last_week)
+
+    counts = ComplaintDailyStats.objects.aggregate(
+        total_complaints=Sum('count', default=0),
+        pending_complaints=Sum('count', filter=Q(status='PENDING'), default=0),
+        resolved_complaints=Sum('count', filter=Q(status='RESOLVED'), default=0),
+        total_complaints_prev=Sum('count', filter=Q(date__lt=last_month_day), default=0),
+        pending_complaints_prev=Sum('count', filter=Q(status='PENDING', date__lt=last_week_day), default=0),
+        resolved_complaints_prev=Sum('count', filter=Q(status='RESOLVED', date__lt=last_week_day), default=0),
+    )
+
+    users = Complaint.objects.filter(created_at__gte=two_months_ago).aggregate(
+        active_users=Count('user', distinct=True, filter=Q(created_at__gte=last_month)),
+        active_users_prev=Count('user', distinct=True, filter=Q(created_at__lt=last_month)),
+    )
+    counts.update(users)
+
+    stats = {}
+    for name in ('total_complaints', 'pending_complaints', 'resolved_complaints', 'active_users'):
+        stats[name] = counts[name]
+        stats[f'{name}_trend'] = calculate_trend(counts[name], counts[f'{name}_prev'])
+    return stats
+
+
+def build_dashboard_data():
+    """Shape the dashboard stats for the polling endpoint"""
+    stats = get_dashboard_stats()
+    periods = {
+        'total_complaints': 'last month',
+        'pending_complaints': 'last week',
+        'resolved_complaints': 'last week',
+        'active_users': 'last month',
+    }
+
+    data = {}
+    for name, period in periods.items():
+        data[name] = stats[name]
+        data[f'{name}_trend'] = {
+            'percentage': stats[f'{name}_trend'],
+            'period': period
+        }
+    return data
+
+
+def get_dashboard_payload():
+    """Return (json_bytes, etag) for the dashboard data, shared by all managers.
+
+    The serialized payload is cached for MANAGER_DASHBOARD_CACHE_SECONDS, and
+    only one thread recomputes it when it expires.
+    """
+    cached = dashboard_cache.get('dashboard_data')
+    if cached is not None:
+        return cached
+
+    with _dashboard_lock:
+        cached = dashboard_cache.get('dashboard_data')
+        if cached is None:
+            body = json.dumps(build_dashboard_data(), cls=DjangoJSONEncoder).encode('utf-8')
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+            cached = (body, etag)
+            dashboard_cache.set('dashboard_data', cached,
+                                ttl=getattr(settings, 'MANAGER_DASHBOARD_CACHE_SECONDS', 5))
+    return cached
+
+
+def complaint_date_range(params):
+    """Parse the date_from/date_to filters into (first_day, last_day), both inclusive.
+
+    Either may be None. A datetime counts as its whole local day, so the
+    complaint query and the daily rollup estimate select the same days.
+    Raises ValueError for a value that is not a date.
+    """
+    days = []
+    for name in ('date_from', 'date_to'):
+        value = params.get(name)
+        day = None
+        if value:
+            try:
+                day = parse_date(value)
+                if day is None:
+                    moment = parse_datetime(value)
+                    if moment is not None:
+                        day = timezone.localdate(moment) if timezone.is_aware(moment) else moment.date()
+            except ValueError:
+                day = None
+            if day is None:
+                raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+        days.append(day)
+    return tuple(days)
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_complaint_queryset(params):
+    """Apply the manager complaint filters (type, status, date_from, date_to)"""
+    complaints = Complaint.objects.all()
+
+    complaint_type = params.get('type')
+    if complaint_type:
+        complaints = complaints.filter(complaint_type=complaint_type)
+
+    status = params.get('status')
+    if status:
+        complaints = complaints.filter(status=status)
+
+    date_from, date_to = complaint_date_range(params)
+    if date_from:
+        complaints = complaints.filter(created_at__gte=_day_start(date_from))
+    if date_to:
+        complaints = complaints.filter(created_at__lt=_day_start(date_to + timedelta(days=1)))
+
+    return complaints
+
+
+def estimate_complaint_count(params):
+    """Estimate the number of matching complaints from the daily rollup"""
+    stats = ComplaintDailyStats.objects.all()
+    if params.get('type'):
+        stats = stats.filter(complaint_type=params['type'])
+    if params.get('status'):
+        stats = stats.filter(status=params['status'])
+    date_from, date_to = complaint_date_range(params)
+    if date_from:
+        stats = stats.filter(date__gte=date_from)
+    if date_to:
+        stats = stats.filter(date__lte=date_to)
+    return stats.aggregate(total=Sum('count', default=0))['total']
+
+
+def count_complaints(complaints, params, limit=None):
+    """Return (count, is_estimate) for a filtered complaint queryset.
+
+    Counting stops after `limit` rows; beyond that the total is estimated
+    from the rollup, since an exact COUNT would scan every match.
+    """
+    limit = limit or COMPLAINT_EXACT_COUNT_LIMIT
+    capped = complaints.order_by().values('pk')[:limit + 1].count()
+    if capped <= limit:
+        return capped, False
+    return max(estimate_complaint_count(params), capped), True
+
+
+def _page_number(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def complaint_ordering(sort):
+    """Translate a sort parameter such as '-created_at' into an order_by() list.
+
+    Unknown columns fall back to newest first. The id is added as a tie
+    breaker so that pages never overlap.
+    """
+    descending = (sort or '').startswith('-')
+    field = COMPLAINT_SORTS.get((sort or '').lstrip('-'))
+    if field is None:
+        return '-created_at', ['-created_at', '-id']
+    prefix = '-' if descending else ''
+    return sort, [f'{prefix}{field}', f'{prefix}id']
+
+
+def get_complaint_page(params):
+    """Return one page of filtered, sorted complaints for the manager UI"""
+    page = _page_number(params.get('page'), 1)
+    page_size = min(_page_number(params.get('page_size'), COMPLAINT_PAGE_SIZE), COMPLAINT_MAX_PAGE_SIZE)
+    offset = (page - 1) * page_size
+    sort, ordering = complaint_ordering(params.get('sort'))
+
+    complaints = filter_complaint_queryset(params)
+    rows = list(
+        complaints.order_by(*ordering)
+        .annotate(username=F('user__username'), short_description=Substr('description', 1, 51))
+        .values('id', 'title', 'complaint_type', 'short_description', 'latitude', 'longitude',
+                'status', 'username', 'created_at', 'image')[offset:offset + page_size + 1]
+    )
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+
+    total, is_estimate = count_complaints(complaints, params)
+    storage = Complaint._meta.get_field('image').storage
+
+    return {
+        'complaints': [{
+            'id': row['id'],
+            'title': row['title'],
+            'complaint_type': row['complaint_type'],
+            'description': row['short_description'][:50] + '...' if len(row['short_description']) > 50 else row['short_description'],
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'status': row['status'],
+            'user': row['username'],
+            'created_at': row['created_at'].strftime('%b %d, %Y %H:%M'),
+            'image': storage.url(row['image']) if row['image'] else None
+        } for row in rows],
+        'page': page,
+        'page_size': page_size,
+        'sort': sort,
+        'has_next': has_next,
+        'total': total,
+        'count_is_estimate': is_estimate,
+    }
+
+
+def status_update_email(complaint, old_status, new_status):
+    """Return the (to_email, subject, html_message, plain_message) status update email"""
+    context = {
+        'user': complaint.user,
+        'complaint_title': complaint.title,
+        'complaint_type': complaint.complaint_type,
+        'old_status': old_status,
+        'new_status': new_status,
+        'description': complaint.description,
+        'created_at': complaint.created_at,
+        'updated_at': complaint.updated_at,
+    }
+    html_message = render_to_string('manager/emails/complaint_status_update.html', context)
+    return (
+        complaint.user.email,
+        f'Complaint Status Update - {complaint.title}',
+        html_message,
+        strip_tags(html_message),
+    )
+
+
+def bulk_update_complaint_status(complaint_ids, new_status, changed_by=None):
+    """Move many complaints to new_status and return how many changed.
+
+    Complaints already in new_status are skipped. The rest are changed with
+    one UPDATE, their status events written with one INSERT and the rollup
+    adjusted once per (day, old status, type) group. Notification emails are
+    queued on the outbox in a single batch after the transaction commits.
+    """
+    valid_statuses = {value for value, _ in Complaint.STATUS_CHOICES}
+    if new_status not in valid_statuses:
+        raise ValueError(f'Invalid status: {new_status}')
+    complaint_ids = {int(complaint_id) for complaint_id in complaint_ids}
+    if len(complaint_ids) > BULK_STATUS_MAX_IDS:
+        raise ValueError(f'At most {BULK_STATUS_MAX_IDS} complaints can be updated at once')
+
+    with transaction.atomic():
+        complaints = list(
+            Complaint.objects.select_for_update(of=('self',))
+            .filter(id__in=complaint_ids).exclude(status=new_status)
+            .select_related('user')
+        )
+        if not complaints:
+            return 0
+
+        now = timezone.now()
+        Complaint.objects.filter(id__in=[c.id for c in complaints]).update(status=new_status, updated_at=now)
+
+        changes = [(complaint, complaint.status) for complaint in complaints]
+        moved = Counter()
+        for complaint, old_status in changes:
+            moved[(timezone.localdate(complaint.created_at), old_status, complaint.complaint_type)] += 1
+            complaint.status, complaint.updated_at = new_status, now
+        ComplaintStatusEvent.objects.bulk_create([
+            ComplaintStatusEvent.build(complaint, old_status, new_status, changed_by)
+            for complaint, old_status in changes
+        ], batch_size=500)
+
+        for (day, old_status, complaint_type), count in moved.items():
+            ComplaintDailyStats.adjust(day, old_status, complaint_type, -count)
+            ComplaintDailyStats.adjust(day, new_status, complaint_type, count)
+
+        transaction.on_commit(lambda: enqueue_emails([
+            status_update_email(complaint, old_status, new_status)
+            for complaint, old_status in changes if complaint.user.email
+        ]))
+
+    return len(complaints)
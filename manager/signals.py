@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import Complaint
+from .models import ComplaintDailyStats, ComplaintStatusEvent
+
+
+@receiver(post_save, sender=Complaint)
+def complaint_created(sender, instance, created, raw=False, **kwargs):
+    # Status changes are recorded explicitly where the old status is known
+    if created and not raw:
+        ComplaintDailyStats.record_created(instance)
+        ComplaintStatusEvent.record(instance, '', instance.status)
+
+
+@receiver(post_delete, sender=Complaint)
+def complaint_deleted(sender, instance, **kwargs):
+    ComplaintDailyStats.record_deleted(instance)
+    ComplaintStatusEvent.record(instance, instance.status, 'DELETED')
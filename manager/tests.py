@@ -1,3 +1,384 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Count, Sum
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from users.models import Complaint, Notification, UserProfile
+from . import outbox
+from .analytics import ResolutionAnalytics
+from .exports import stream_csv, write_xlsx
+from .fanout import resume_notification_jobs
+from .geofence import Geofence
+from .models import (AnalyticsCursor, ComplaintDailyStats, ComplaintResolution, ComplaintStatusEvent, EmailOutbox,
+                     NotificationJob, ReportJob)
+from .reports import REPORT_JOB_TIMEOUT, get_or_start_report, report_key
+from .services import bulk_update_complaint_status, estimate_complaint_count, filter_complaint_queryset
+
+
+class ComplaintRollupTests(TestCase):
+    """The daily rollup must always match the complaints it summarises"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('manager', password='pw', is_staff=True, is_superuser=True)
+        cls.citizen = User.objects.create_user('citizen', email='citizen@example.com')
+
+    def setUp(self):
+        self.client.force_login(self.manager)
+        self.complaints = [
+            Complaint.objects.create(
+                user=self.citizen, title=f'Pothole {i}', description='Deep pothole', image='complaints/x.jpg',
+                complaint_type='POTHOLE', latitude=12.97, longitude=77.59,
+            )
+            for i in range(3)
+        ]
+
+    def assertRollupConsistent(self):
+        actual = {
+            (row['status'], row['complaint_type']): row['n']
+            for row in Complaint.objects.values('status', 'complaint_type').annotate(n=Count('id'))
+        }
+        rollup = {
+            (row['status'], row['complaint_type']): row['n']
+            for row in ComplaintDailyStats.objects.values('status', 'complaint_type').annotate(n=Sum('count'))
+            if row['n']
+        }
+        self.assertEqual(rollup, actual)
+
+    def test_single_update_moves_rollup(self):
+        response = self.client.post('/manager/complaints/update-status/', {
+            'complaint_id': self.complaints[0].id, 'status': 'IN_PROGRESS',
+        })
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(Complaint.objects.get(pk=self.complaints[0].pk).status, 'IN_PROGRESS')
+        self.assertEqual(ComplaintStatusEvent.objects.filter(complaint=self.complaints[0], to_status='IN_PROGRESS').count(), 1)
+        self.assertRollupConsistent()
+
+    def test_invalid_status_is_rejected(self):
+        response = self.client.post('/manager/complaints/update-status/', {
+            'complaint_id': self.complaints[0].id, 'status': 'BOGUS',
+        })
+        self.assertFalse(response.json()['success'])
+        self.assertEqual(Complaint.objects.get(pk=self.complaints[0].pk).status, 'PENDING')
+        self.assertFalse(ComplaintDailyStats.objects.filter(status='BOGUS').exists())
+        self.assertRollupConsistent()
+
+    def test_bulk_update_moves_rollup(self):
+        ids = [c.id for c in self.complaints]
+        self.assertEqual(bulk_update_complaint_status(ids, 'RESOLVED', changed_by=self.manager), 3)
+        # Repeating the update changes nothing
+        self.assertEqual(bulk_update_complaint_status(ids, 'RESOLVED', changed_by=self.manager), 0)
+        self.assertRollupConsistent()
+
+    def test_admin_type_and_status_edit(self):
+        complaint = self.complaints[0]
+        complaint.complaint_type = 'GARBAGE'
+        complaint.status = 'RESOLVED'
+        request = RequestFactory().post('/')
+        request.user = self.manager
+        site._registry[Complaint].save_model(request, complaint, form=None, change=True)
+        self.assertRollupConsistent()
+        self.assertEqual(ComplaintStatusEvent.objects.filter(complaint=complaint, to_status='RESOLVED').count(), 1)
+
+
+class ComplaintFilterTests(TestCase):
+    """The exact count and the rollup estimate select the same days"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('filterer')
+        Complaint.objects.create(
+            user=user, title='Signal out', description='Dark at the junction', image='complaints/x.jpg',
+            complaint_type='BROKEN_SIGNAL', latitude=12.97, longitude=77.59,
+        )
+
+    def assertCounts(self, params, expected):
+        self.assertEqual(filter_complaint_queryset(params).count(), expected)
+        self.assertEqual(estimate_complaint_count(params), expected)
+
+    def test_date_to_includes_the_whole_day(self):
+        today = timezone.localdate()
+        self.assertCounts({'date_from': today.isoformat(), 'date_to': today.isoformat()}, 1)
+        # A time on the same day still selects the whole day, in both counts
+        self.assertCounts({'date_to': f'{today.isoformat()}T00:00:01'}, 1)
+        self.assertCounts({'date_from': (today + timedelta(days=1)).isoformat()}, 0)
+        self.assertCounts({'date_to': (today - timedelta(days=1)).isoformat()}, 0)
+
+    def test_invalid_date_on_complaints_page(self):
+        self.client.force_login(User.objects.get(username='filterer'))
+        response = self.client.get('/manager/complaints/', {'date_from': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['filters'], {})
+        self.assertEqual(response.context['total'], 1)
+        self.assertIn('date_from', ' '.join(str(m) for m in response.context['messages']))
+
+    def test_invalid_date_is_rejected(self):
+        with self.assertRaises(ValueError):
+            filter_complaint_queryset({'date_from': 'garbage'})
+        with self.assertRaises(ValueError):
+            estimate_complaint_count({'date_to': '2026-02-30'})
+
+
+@override_settings(EMAIL_OUTBOX_AUTO_DRAIN=False)
+class NotificationJobTests(TestCase):
+    """Interrupted fan-outs pick up after the last delivered user"""
+
+    def test_resume_continues_from_cursor(self):
+        users = [User.objects.create_user(f'resident{i}', email=f'resident{i}@example.com') for i in range(3)]
+        job = NotificationJob.objects.create(
+            title='Water cut', message='No water tomorrow', notification_type='ALERT',
+            status='RUNNING', last_user_id=users[0].pk,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            resumed = resume_notification_jobs()
+
+        self.assertEqual([j.status for j in resumed], ['COMPLETED'])
+        self.assertEqual(set(Notification.objects.values_list('user', flat=True)), {users[1].pk, users[2].pk})
+        self.assertEqual(
+            set(EmailOutbox.objects.values_list('to_email', flat=True)),
+            {users[1].email, users[2].email},
+        )
+        job.refresh_from_db()
+        self.assertEqual(job.last_user_id, users[2].pk)
+
+
+@override_settings(EMAIL_OUTBOX_AUTO_DRAIN=True)
+class OutboxDrainTests(SimpleTestCase):
+    """A process never runs more than one drain, nor sends faster than the rate"""
+
+    def test_single_drainer(self):
+        active, peak, calls = [0], [0], [0]
+        lock, release = threading.Lock(), threading.Event()
+
+        def fake_drain():
+            with lock:
+                active[0] += 1
+                calls[0] += 1
+                peak[0] = max(peak[0], active[0])
+            release.wait(5)
+            with lock:
+                active[0] -= 1
+
+        with mock.patch.object(outbox, 'drain_outbox', fake_drain):
+            schedulers = [threading.Thread(target=outbox.schedule_drain) for _ in range(20)]
+            for thread in schedulers:
+                thread.start()
+            for thread in schedulers:
+                thread.join()
+            release.set()
+            for _ in range(100):
+                if not outbox._drain_running:
+                    break
+                time.sleep(0.05)
+
+        self.assertFalse(outbox._drain_running)
+        self.assertEqual(peak[0], 1)
+        # Requests made during the first pass fold into at most one more
+        self.assertLessEqual(calls[0], 2)
+
+    def test_rate_limit_is_shared_between_threads(self):
+        limiter = outbox.RateLimiter()
+        started = time.monotonic()
+        workers = [
+            threading.Thread(target=lambda: [limiter.wait(100) for _ in range(5)])
+            for _ in range(4)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        # 20 sends at 100 per second take at least 19 intervals, whatever the thread count
+        self.assertGreaterEqual(time.monotonic() - started, 0.19 - 0.01)
+
+
+class OutboxClaimTests(TestCase):
+    """A batch still sending at a slow rate is not handed out a second time"""
+
+    def test_slow_batch_is_not_reclaimed(self):
+        # 100 emails at one per second take 100s; the timeout leaves room for twice that
+        self.assertEqual(outbox.sending_timeout(100, rate=0.1), timedelta(seconds=2000))
+        self.assertEqual(outbox.sending_timeout(100, rate=10), outbox.STALE_SENDING_AFTER)
+
+        email = EmailOutbox.objects.create(to_email='a@example.com', subject='s', body_text='b')
+        EmailOutbox.objects.filter(pk=email.pk).update(
+            status='SENDING', next_attempt_at=timezone.now() - timedelta(minutes=15)
+        )
+        self.assertEqual(outbox.claim_batch(100, rate=0.1), [])
+        self.assertEqual([e.pk for e in outbox.claim_batch(100, rate=10)], [email.pk])
+
+
+class ExportTests(TestCase):
+    """Complaint text must reach spreadsheets as text, never as a formula"""
+
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user('exporter')
+        Complaint.objects.create(
+            user=user, title='=HYPERLINK("http://example.com","x")', description='@SUM(A1)',
+            image='complaints/x.jpg', complaint_type='OTHER', latitude=-12.5, longitude=77.59,
+        )
+
+    def test_csv_quotes_formulas(self):
+        body = ''.join(stream_csv({}))
+        self.assertIn('"\'=HYPERLINK(""http://example.com"",""x"")"', body)
+        self.assertIn("'@SUM(A1)", body)
+        self.assertIn(',-12.5,', body)
+
+    def test_invalid_filter_is_a_bad_request(self):
+        self.client.force_login(User.objects.get(username='exporter'))
+        for export_format in ('csv', 'xlsx'):
+            response = self.client.get('/manager/complaints/export/', {'format': export_format, 'date_from': 'garbage'})
+            self.assertEqual(response.status_code, 400)
+            self.assertFalse(response.json()['success'])
+
+    def test_xlsx_quotes_formulas(self):
+        from openpyxl import load_workbook
+
+        sheet = load_workbook(write_xlsx({})).active
+        row = [cell.value for cell in sheet[2]]
+        self.assertEqual(row[1], '\'=HYPERLINK("http://example.com","x")')
+        self.assertEqual(row[4], "'@SUM(A1)")
+        self.assertEqual(row[5], -12.5)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+@mock.patch('manager.reports.run_in_background')
+class ReportJobTests(TestCase):
+    """Report jobs orphaned by a restart must not block their report forever"""
+
+    def test_live_job_is_reused(self, run_in_background):
+        with self.captureOnCommitCallbacks(execute=True):
+            _, first = get_or_start_report({})
+            _, second = get_or_start_report({})
+        self.assertEqual(first.pk, second.pk)
+        run_in_background.assert_called_once()
+
+    def test_orphaned_job_is_replaced(self, run_in_background):
+        orphan = ReportJob.objects.create(key=report_key({}), status='RUNNING', progress=10)
+        ReportJob.objects.filter(pk=orphan.pk).update(
+            updated_at=timezone.now() - REPORT_JOB_TIMEOUT - timedelta(minutes=1)
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            _, job = get_or_start_report({})
+
+        self.assertNotEqual(job.pk, orphan.pk)
+        orphan.refresh_from_db()
+        self.assertEqual(orphan.status, 'FAILED')
+        run_in_background.assert_called_once()
+
+
+class ResolutionAnalyticsTests(TestCase):
+    """Resolution analytics are folded into the database once, one row per complaint"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('analyst')
+        cls.citizen = User.objects.create_user('resident')
+
+    def complaint(self):
+        return Complaint.objects.create(
+            user=self.citizen, title='Leak', description='Pipe leaking', image='complaints/x.jpg',
+            complaint_type='WATER_LEAK', latitude=12.97, longitude=77.59,
+        )
+
+    def test_reopened_complaint_counts_once(self):
+        complaint = self.complaint()
+        for status in ('RESOLVED', 'IN_PROGRESS', 'RESOLVED'):
+            bulk_update_complaint_status([complaint.id], status, changed_by=self.manager)
+
+        summary = ResolutionAnalytics().summary(days=1)
+        self.assertEqual(summary['resolved_count'], 1)
+        self.assertEqual(summary['backlog'][-1]['open'], 0)
+
+    def test_reopening_removes_resolution(self):
+        complaint = self.complaint()
+        bulk_update_complaint_status([complaint.id], 'RESOLVED', changed_by=self.manager)
+        ResolutionAnalytics().refresh()
+        bulk_update_complaint_status([complaint.id], 'PENDING', changed_by=self.manager)
+
+        summary = ResolutionAnalytics().summary(days=1)
+        self.assertEqual(summary['resolved_count'], 0)
+        self.assertIsNone(summary['resolution_hours']['p50'])
+        self.assertEqual(summary['backlog'][-1]['open'], 1)
+
+    def test_deleted_complaint_drops_resolution(self):
+        complaint = self.complaint()
+        complaint_id = complaint.id
+        bulk_update_complaint_status([complaint_id], 'RESOLVED', changed_by=self.manager)
+        analytics = ResolutionAnalytics()
+        analytics.refresh()
+        complaint.delete()
+
+        incremental = analytics.summary(days=1)
+        self.assertEqual(incremental['resolved_count'], 0)
+        # The log still names the complaint on every event, the deletion included
+        self.assertEqual(
+            list(ComplaintStatusEvent.objects.values_list('complaint_id', 'to_status')),
+            [(complaint_id, 'PENDING'), (complaint_id, 'RESOLVED'), (complaint_id, 'DELETED')],
+        )
+        analytics.reset()
+        self.assertEqual(analytics.summary(days=1), incremental)
+
+    def test_state_is_shared_between_instances(self):
+        complaints = [self.complaint() for _ in range(2)]
+        bulk_update_complaint_status([c.id for c in complaints], 'RESOLVED', changed_by=self.manager)
+        ResolutionAnalytics().refresh()
+        last_event_id = AnalyticsCursor.objects.get(name='resolution').last_event_id
+        self.assertEqual(last_event_id, ComplaintStatusEvent.objects.latest('id').id)
+
+        # A fresh worker resumes from the stored cursor instead of rereading the log
+        with CaptureQueriesContext(connection) as queries:
+            ResolutionAnalytics().refresh()
+        event_reads = [q['sql'] for q in queries if 'manager_complaintstatusevent' in q['sql']]
+        self.assertEqual(len(event_reads), 1)
+        self.assertIn(f'> {last_event_id}', event_reads[0])
+        self.assertEqual(ComplaintResolution.objects.count(), 2)
+
+
+class GeofenceTests(TestCase):
+    """Geofenced broadcasts reach exactly the users located inside the fence"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.locations = {
+            'centre': (12.9716, 77.5946),
+            'nearby': (12.9800, 77.6000),
+            'across_town': (13.0500, 77.7000),
+        }
+        cls.user_ids = {}
+        for name, (latitude, longitude) in cls.locations.items():
+            user = User.objects.create_user(name)
+            UserProfile.objects.create(user=user, latitude=latitude, longitude=longitude)
+            cls.user_ids[name] = user.id
+        # Users without a location are never targeted by a fence
+        UserProfile.objects.create(user=User.objects.create_user('unplaced'))
+
+    def test_circle(self):
+        fence = Geofence('circle', center=self.locations['centre'], radius_km=2)
+        self.assertTrue(fence.contains(*self.locations['nearby']))
+        self.assertFalse(fence.contains(*self.locations['across_town']))
+        self.assertEqual(fence.select_user_ids(), sorted([self.user_ids['centre'], self.user_ids['nearby']]))
+
+    def test_polygon(self):
+        # A triangle around the centre that stops short of the nearby user
+        fence = Geofence('polygon', polygon=[(12.96, 77.58), (12.96, 77.61), (12.975, 77.595)])
+        self.assertTrue(fence.contains(*self.locations['centre']))
+        self.assertFalse(fence.contains(*self.locations['nearby']))
+        self.assertEqual(fence.select_user_ids(), [self.user_ids['centre']])
+
+    def test_from_post(self):
+        fence = Geofence.from_post({'target': 'circle', 'center_lat': '12.97', 'center_lng': '77.59', 'radius_km': '1.5'})
+        self.assertEqual(fence.to_dict(), {'shape': 'circle', 'center': [12.97, 77.59], 'radius_km': 1.5})
+        self.assertEqual(Geofence.from_dict(fence.to_dict()).to_dict(), fence.to_dict())
+        self.assertIsNone(Geofence.from_post({'target': 'all'}))
+        with self.assertRaises(ValueError):
+            Geofence.from_post({'target': 'polygon', 'polygon': '[[12.9, 77.5], [13.0, 77.6]]'})
@@ -12,9 +12,15 @@ urlpatterns = [
     path('smoke-monitor/', views.smoke_monitor_redirect, name='smoke_monitor_redirect'),
     path('complaints/', views.complaints_view, name='complaints'),
     path('complaints/update-status/', views.update_complaint_status, name='update_complaint_status'),
+    path('complaints/bulk-update-status/', views.bulk_update_complaint_status_view, name='bulk_update_complaint_status'),
     path('complaints/filter/', views.filter_complaints, name='filter_complaints'),
     path('complaints/export-pdf/', views.export_complaints_pdf, name='export_complaints_pdf'),
+    path('reports/<int:job_id>/', views.report_job_status, name='report_job_status'),
+    path('reports/<int:job_id>/download/', views.download_report, name='download_report'),
+    path('complaints/export/', views.export_complaints, name='export_complaints'),
     path('notifications/', views.notifications_view, name='notifications'),
     path('notifications/send/', views.send_notification, name='send_notification'),
+    path('notifications/jobs/<int:job_id>/', views.notification_job_status, name='notification_job_status'),
     path('dashboard-data/', views.dashboard_data_view, name='dashboard_data'),
+    path('analytics/resolution/', views.resolution_analytics_view, name='resolution_analytics'),
 ]
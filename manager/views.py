@@ -5,20 +5,19 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
-from users.models import Complaint, Notification
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Count
-from datetime import datetime, timedelta
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from io import BytesIO
+from django.core.exceptions import ValidationError
+from users.models import Broadcast, Complaint, Notification
+from django.http import FileResponse, JsonResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from .analytics import resolution_analytics
+from .exports import stream_csv, write_xlsx
+from .fanout import start_notification_job
+from .geofence import Geofence
+from .models import NotificationJob, ReportJob
+from .reports import get_or_start_report, report_path
+from .services import (bulk_update_complaint_status, get_complaint_page, get_dashboard_payload,
+                       get_dashboard_stats)
 
 # Create your views here.
 
@@ -69,66 +68,23 @@ def logout_view(request):
 
 @login_required
 def dashboard_view(request):
-    # Fetch real-time data from database
-    from django.db.models import Count
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Get current date and calculate date ranges
-    now = timezone.now()
-    last_month = now - timedelta(days=30)
-    last_week = now - timedelta(days=7)
-    two_months_ago = now - timedelta(days=60)
-    two_weeks_ago = now - timedelta(days=14)
-    
-    # Current counts
-    total_complaints = Complaint.objects.count()
-    pending_complaints = Complaint.objects.filter(status='PENDING').count()
-    resolved_complaints = Complaint.objects.filter(status='RESOLVED').count()
-    active_users = User.objects.filter(
-        complaint__created_at__gte=last_month
-    ).distinct().count()
-    
-    # Previous period counts for trend calculation
-    total_complaints_prev = Complaint.objects.filter(
-        created_at__lt=last_month
-    ).count()
-    pending_complaints_prev = Complaint.objects.filter(
-        status='PENDING',
-        created_at__lt=last_week
-    ).count()
-    resolved_complaints_prev = Complaint.objects.filter(
-        status='RESOLVED',
-        created_at__lt=last_week
-    ).count()
-    active_users_prev = User.objects.filter(
-        complaint__created_at__gte=two_months_ago,
-        complaint__created_at__lt=last_month
-    ).distinct().count()
-    
-    # Calculate trend percentages
-    def calculate_trend(current, previous):
-        if previous == 0:
-            return 100 if current > 0 else 0
-        return round(((current - previous) / previous) * 100, 1)
+    # All counts and trends come from the shared stats service
+    stats = get_dashboard_stats()
     
     # Recent activities (latest complaints)
     recent_activities = Complaint.objects.select_related('user').order_by('-created_at')[:5]
     
-    # Recent alerts (latest notifications)
-    recent_alerts = Notification.objects.select_related('user').order_by('-created_at')[:5]
+    # Recent alerts (latest notifications and city-wide broadcasts)
+    recent_alerts = sorted(
+        list(Notification.objects.order_by('-created_at')[:5]) + list(Broadcast.objects.all()[:5]),
+        key=lambda alert: alert.created_at,
+        reverse=True
+    )[:5]
     
     context = {
-        'total_complaints': total_complaints,
-        'pending_complaints': pending_complaints,
-        'resolved_complaints': resolved_complaints,
-        'active_users': active_users,
+        **stats,
         'recent_activities': recent_activities,
         'recent_alerts': recent_alerts,
-        'total_complaints_trend': calculate_trend(total_complaints, total_complaints_prev),
-        'pending_complaints_trend': calculate_trend(pending_complaints, pending_complaints_prev),
-        'resolved_complaints_trend': calculate_trend(resolved_complaints, resolved_complaints_prev),
-        'active_users_trend': calculate_trend(active_users, active_users_prev),
     }
     
     return render(request, 'manager/dashboard.html', context)
@@ -143,8 +99,20 @@ def smoke_monitor_redirect(request):
 
 @login_required
 def complaints_view(request):
-    complaints = Complaint.objects.all().order_by('-created_at')
-    return render(request, 'manager/complaints.html', {'complaints': complaints})
+    # Only the first page is rendered here; later pages come from filter_complaints
+    filters = request.GET
+    try:
+        page_data = get_complaint_page(filters)
+    except (ValidationError, ValueError) as e:
+        messages.error(request, f"Invalid filter: {e}")
+        filters = {}
+        page_data = get_complaint_page(filters)
+    return render(request, 'manager/complaints.html', {
+        **page_data,
+        'filters': filters,
+        'complaint_types': Complaint.COMPLAINT_TYPES,
+        'status_choices': Complaint.STATUS_CHOICES,
+    })
 
 @login_required
 def update_complaint_status(request):
@@ -153,36 +121,13 @@ def update_complaint_status(request):
             complaint_id = request.POST.get('complaint_id')
             new_status = request.POST.get('status')
             
-            complaint = Complaint.objects.get(id=complaint_id)
-            old_status = complaint.status
-            complaint.status = new_status
-            complaint.save()
-            
-            # Prepare email content
-            context = {
-                'user': complaint.user,
-                'complaint_title': complaint.title,
-                'complaint_type': complaint.complaint_type,
-                'old_status': old_status,
-                'new_status': new_status,
-                'description': complaint.description,
-                'created_at': complaint.created_at,
-                'updated_at': complaint.updated_at,
-            }
+            if not Complaint.objects.filter(id=complaint_id).exists():
+                return JsonResponse({'success': False, 'error': 'Complaint not found'})
             
-            # Render email content from template
-            html_message = render_to_string('manager/emails/complaint_status_update.html', context)
-            plain_message = strip_tags(html_message)
-            
-            # Send email
-            send_mail(
-                subject=f'Complaint Status Update - {complaint.title}',
-                message=plain_message,
-                from_email=None,  # Uses DEFAULT_FROM_EMAIL from settings
-                recipient_list=[complaint.user.email],
-                html_message=html_message,
-                fail_silently=False,
-            )
+            # Same locked, validated path as bulk updates, so the rollup and
+            # status event log stay in step with the complaint; the email is
+            # queued once the transaction commits
+            bulk_update_complaint_status([complaint_id], new_status, changed_by=request.user)
             
             return JsonResponse({'success': True})
         except Exception as e:
@@ -190,295 +135,185 @@ def update_complaint_status(request):
     
     return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
+@login_required
+def bulk_update_complaint_status_view(request):
+    """Move every complaint in complaint_ids to one status in a single update"""
+    if request.method == 'POST':
+        try:
+            updated = bulk_update_complaint_status(
+                request.POST.getlist('complaint_ids'),
+                request.POST.get('status'),
+                changed_by=request.user,
+            )
+            return JsonResponse({'success': True, 'updated': updated})
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)})
+    
+    return JsonResponse({'success': False, 'error': 'Invalid request method'})
+
 @login_required
 def dashboard_data_view(request):
     """API endpoint for real-time dashboard data"""
-    from django.db.models import Count
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Get current date and calculate date ranges
-    now = timezone.now()
-    last_month = now - timedelta(days=30)
-    last_week = now - timedelta(days=7)
-    two_months_ago = now - timedelta(days=60)
-    two_weeks_ago = now - timedelta(days=14)
-    
-    # Current counts
-    total_complaints = Complaint.objects.count()
-    pending_complaints = Complaint.objects.filter(status='PENDING').count()
-    resolved_complaints = Complaint.objects.filter(status='RESOLVED').count()
-    active_users = User.objects.filter(
-        complaint__created_at__gte=last_month
-    ).distinct().count()
-    
-    # Previous period counts for trend calculation
-    total_complaints_prev = Complaint.objects.filter(
-        created_at__lt=last_month
-    ).count()
-    pending_complaints_prev = Complaint.objects.filter(
-        status='PENDING',
-        created_at__lt=last_week
-    ).count()
-    resolved_complaints_prev = Complaint.objects.filter(
-        status='RESOLVED',
-        created_at__lt=last_week
-    ).count()
-    active_users_prev = User.objects.filter(
-        complaint__created_at__gte=two_months_ago,
-        complaint__created_at__lt=last_month
-    ).distinct().count()
+    body, etag = get_dashboard_payload()
     
-    # Calculate trend percentages
-    def calculate_trend(current, previous):
-        if previous == 0:
-            return 100 if current > 0 else 0
-        return round(((current - previous) / previous) * 100, 1)
+    # Unchanged polls are answered without sending the payload again
+    if etag in request.headers.get('If-None-Match', ''):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
     
-    data = {
-        'total_complaints': total_complaints,
-        'pending_complaints': pending_complaints,
-        'resolved_complaints': resolved_complaints,
-        'active_users': active_users,
-        'total_complaints_trend': {
-            'percentage': calculate_trend(total_complaints, total_complaints_prev),
-            'period': 'last month'
-        },
-        'pending_complaints_trend': {
-            'percentage': calculate_trend(pending_complaints, pending_complaints_prev),
-            'period': 'last week'
-        },
-        'resolved_complaints_trend': {
-            'percentage': calculate_trend(resolved_complaints, resolved_complaints_prev),
-            'period': 'last week'
-        },
-        'active_users_trend': {
-            'percentage': calculate_trend(active_users, active_users_prev),
-            'period': 'last month'
-        }
-    }
-    
-    return JsonResponse(data)
+    return response
+
+@login_required
+def resolution_analytics_view(request):
+    """API endpoint for resolution-time percentiles and the open backlog over time"""
+    try:
+        days = min(max(int(request.GET.get('days', 30)), 1), 365)
+    except ValueError:
+        days = 30
+    return JsonResponse({'success': True, **resolution_analytics.summary(days)})
 
 @login_required
 def filter_complaints(request):
-    complaints = Complaint.objects.all()
-    
-    # Filter by type
-    complaint_type = request.GET.get('type')
-    if complaint_type:
-        complaints = complaints.filter(complaint_type=complaint_type)
-    
-    # Filter by status
-    status = request.GET.get('status')
-    if status:
-        complaints = complaints.filter(status=status)
-    
-    # Filter by date range
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    
-    if date_from:
-        complaints = complaints.filter(created_at__gte=date_from)
-    if date_to:
-        complaints = complaints.filter(created_at__lte=date_to)
-    
-    # Order by latest first
-    complaints = complaints.order_by('-created_at')
-    
-    # Prepare the data for JSON response
-    complaints_data = [{
-        'id': c.id,
-        'title': c.title,
-        'complaint_type': c.complaint_type,
-        'description': c.description[:50] + '...' if len(c.description) > 50 else c.description,
-        'latitude': c.latitude,
-        'longitude': c.longitude,
-        'status': c.status,
-        'user': c.user.username,
-        'created_at': c.created_at.strftime('%b %d, %Y %H:%M'),
-        'image': c.image.url if c.image else None
-    } for c in complaints]
-    
-    return JsonResponse({
-        'success': True,
-        'complaints': complaints_data
-    })
+    """API endpoint returning one page of filtered complaints.
+
+    Accepts type, status, date_from, date_to, page and page_size. The total
+    is exact up to a limit and estimated beyond it (count_is_estimate).
+    """
+    try:
+        return JsonResponse({'success': True, **get_complaint_page(request.GET)})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
 
 @login_required
 def export_complaints_pdf(request):
-    # Create the HttpResponse object with PDF headers
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(letter))
+    """Serve the PDF report for the current filters, building it in the background if needed"""
+    try:
+        path, job = get_or_start_report(request.GET, request.user)
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
     
-    # Container for the 'Flowable' objects
-    elements = []
+    if path:
+        return FileResponse(open(path, 'rb'), as_attachment=True,
+                            filename='complaints_report.pdf', content_type='application/pdf')
     
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = styles['Heading1']
-    subtitle_style = styles['Heading2']
-    normal_style = styles['Normal']
-
-    # Add title
-    elements.append(Paragraph('Complaints Report', title_style))
-    elements.append(Spacer(1, 20))
-
-    # Add summary statistics
-    total_complaints = Complaint.objects.count()
-    pending_complaints = Complaint.objects.filter(status='PENDING').count()
-    in_progress_complaints = Complaint.objects.filter(status='IN_PROGRESS').count()
-    resolved_complaints = Complaint.objects.filter(status='RESOLVED').count()
-
-    # Summary Table
-    summary_data = [
-        ['Summary Statistics'],
-        ['Total Complaints', str(total_complaints)],
-        ['Pending Complaints', str(pending_complaints)],
-        ['In Progress Complaints', str(in_progress_complaints)],
-        ['Resolved Complaints', str(resolved_complaints)]
-    ]
-
-    summary_table = Table(summary_data)
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 14),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('TEXTCOLOR', (0, 1), (-1, -1), colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 12),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    return JsonResponse(report_job_data(job), status=202)
 
-    elements.append(summary_table)
-    elements.append(Spacer(1, 20))
-
-    # Complaints by Type
-    elements.append(Paragraph('Complaints by Type', subtitle_style))
-    type_counts = Complaint.objects.values('complaint_type').annotate(
-        count=Count('id')
-    ).order_by('-count')
-
-    type_data = [['Type', 'Count']]
-    type_data.extend([[t['complaint_type'], str(t['count'])] for t in type_counts])
-
-    type_table = Table(type_data)
-    type_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    elements.append(type_table)
-    elements.append(Spacer(1, 20))
+def report_job_data(job):
+    return {
+        'success': job.status != 'FAILED',
+        'id': job.id,
+        'status': job.status,
+        'progress': job.progress,
+        'error': job.error,
+        'status_url': reverse('manager:report_job_status', args=[job.id]),
+        'download_url': reverse('manager:download_report', args=[job.id]),
+    }
 
-    # Recent Complaints Table
-    elements.append(Paragraph('Recent Complaints', subtitle_style))
-    complaints = Complaint.objects.all().order_by('-created_at')[:10]
+@login_required
+def report_job_status(request, job_id):
+    """API endpoint reporting the progress of a PDF report job"""
+    try:
+        job = ReportJob.objects.get(id=job_id)
+    except ReportJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Report not found'}, status=404)
     
-    complaints_data = [['Title', 'Type', 'Status', 'Submitted By', 'Date']]
-    complaints_data.extend([
-        [
-            c.title,
-            c.complaint_type,
-            c.status,
-            c.user.username,
-            c.created_at.strftime('%Y-%m-%d %H:%M')
-        ] for c in complaints
-    ])
+    return JsonResponse(report_job_data(job))
 
-    complaints_table = Table(complaints_data)
-    complaints_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
-
-    elements.append(complaints_table)
+@login_required
+def download_report(request, job_id):
+    """Download the PDF produced by a completed report job"""
+    try:
+        job = ReportJob.objects.get(id=job_id, status='COMPLETED')
+        return FileResponse(open(report_path(job.key), 'rb'), as_attachment=True,
+                            filename='complaints_report.pdf', content_type='application/pdf')
+    except (ReportJob.DoesNotExist, FileNotFoundError):
+        return JsonResponse({'success': False, 'error': 'Report not found'}, status=404)
 
-    # Build PDF
-    doc.build(elements)
+@login_required
+def export_complaints(request):
+    """Export every complaint matching the filter_complaints filters as CSV or XLSX"""
+    export_format = request.GET.get('format', 'csv')
+    filename = f"complaints_{timezone.now():%Y%m%d_%H%M}"
     
-    # Get the value of the BytesIO buffer and return it
-    pdf = buffer.getvalue()
-    buffer.close()
+    if export_format == 'xlsx':
+        try:
+            output = write_xlsx(request.GET)
+        except ImportError:
+            return JsonResponse({'success': False, 'error': 'Excel export requires openpyxl to be installed'}, status=501)
+        except (ValidationError, ValueError) as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=400)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"{filename}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
     
-    # Create the HTTP response
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="complaints_report.pdf"'
-    response.write(pdf)
+    if export_format != 'csv':
+        return JsonResponse({'success': False, 'error': 'Unsupported export format'}, status=400)
     
+    try:
+        lines = stream_csv(request.GET)
+    except (ValidationError, ValueError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
     return response
 
 @login_required
 def notifications_view(request):
     """View to display the notifications management page"""
     # Get recently sent notifications
-    recent_notifications = Notification.objects.filter(
-        notification_type='ALERT'
-    ).order_by('-created_at')[:10]
+    recent_notifications = Broadcast.objects.all()[:10]
+    
+    # Broadcast jobs with their delivery progress
+    recent_jobs = NotificationJob.objects.all()[:10]
     
     return render(request, 'manager/notifications.html', {
-        'recent_notifications': recent_notifications
+        'recent_notifications': recent_notifications,
+        'recent_jobs': recent_jobs
     })
 
 @login_required
 def send_notification(request):
-    """Send a notification to all citizens via app and email"""
+    """Queue a notification to all citizens, or those inside a geofence, via app and email"""
     if request.method == 'POST':
         try:
-            notification_type = request.POST.get('notification_type')
-            title = request.POST.get('title')
-            message = request.POST.get('message')
-            priority = request.POST.get('priority', 'normal')
+            geofence = Geofence.from_post(request.POST)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('manager:notifications')
+        
+        try:
+            if geofence is None:
+                # One row reaches every citizen in-app; see users.notifications
+                broadcast = Broadcast.objects.create(
+                    title=request.POST.get('title'),
+                    message=request.POST.get('message'),
+                    notification_type=request.POST.get('notification_type'),
+                    created_by=request.user
+                )
+            else:
+                broadcast = None
             
-            # Get all users
-            users = User.objects.all()
+            job = NotificationJob.objects.create(
+                title=request.POST.get('title'),
+                message=request.POST.get('message'),
+                notification_type=request.POST.get('notification_type'),
+                priority=request.POST.get('priority', 'normal'),
+                created_by=request.user,
+                broadcast=broadcast,
+                geofence=geofence.to_dict() if geofence else None
+            )
             
-            # Create notifications and send emails for each user
-            for user in users:
-                # Create in-app notification
-                Notification.objects.create(
-                    user=user,
-                    title=title,
-                    message=message,
-                    notification_type=notification_type,
-                    is_read=False
-                )
-                
-                # Prepare email content
-                context = {
-                    'user': user,
-                    'title': title,
-                    'message': message,
-                    'notification_type': notification_type,
-                    'priority': priority,
-                    'timestamp': timezone.now()
-                }
-                
-                # Render email content from template
-                html_message = render_to_string('manager/emails/notification_alert.html', context)
-                plain_message = strip_tags(html_message)
-                
-                # Send email
-                send_mail(
-                    subject=f'Smart City Alert: {title}',
-                    message=plain_message,
-                    from_email=None,  # Uses DEFAULT_FROM_EMAIL from settings
-                    recipient_list=[user.email],
-                    html_message=html_message,
-                    fail_silently=True  # Set to True to prevent email errors from breaking the notification process
-                )
+            # Fan-out happens in the background; progress shows on the page
+            start_notification_job(job)
             
-            messages.success(request, f"Notification '{title}' sent successfully to {users.count()} users via app and email.")
+            audience = 'all users' if geofence is None else 'users in the selected area'
+            messages.success(request, f"Notification '{job.title}' queued for delivery to {audience} via app and email.")
             return redirect('manager:notifications')
             
         except Exception as e:
@@ -486,3 +321,21 @@ def send_notification(request):
             return redirect('manager:notifications')
     
     return redirect('manager:notifications')
+
+@login_required
+def notification_job_status(request, job_id):
+    """API endpoint reporting the progress of a broadcast job"""
+    try:
+        job = NotificationJob.objects.get(id=job_id)
+    except NotificationJob.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Job not found'}, status=404)
+    
+    return JsonResponse({
+        'success': True,
+        'id': job.id,
+        'status': job.status,
+        'processed': job.processed,
+        'total_recipients': job.total_recipients,
+        'progress': job.progress,
+        'error': job.error
+    })
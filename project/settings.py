@@ -203,4 +203,42 @@ CSRF_COOKIE_HTTPONLY = False  # to allow JavaScript access
 
 # WhiteNoise for static serving
 MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
\ No newline at end of file
+STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
+
+# Emergency (SOS) facility routing
+# Places results are folded into the local facility registry in the background
+SOS_PLACES_ENRICHMENT = os.getenv('SOS_PLACES_ENRICHMENT', 'True') == 'True'
+# Registry facilities further away than this are ignored in favour of Places
+SOS_FACILITY_MAX_KM = 25
+# Hard deadline (seconds) for the AI response and facility lookup in an SOS
+# submission; anything slower is replaced by vetted guidance and patched later
+SOS_RESPONSE_DEADLINE = float(os.getenv('SOS_RESPONSE_DEADLINE', '3.0'))
+SOS_AI_TIMEOUT = 20
+# Ask Gemini for personalized SOS guidance after the cached first response
+SOS_LLM_PERSONALIZATION = os.getenv('SOS_LLM_PERSONALIZATION', 'True') == 'True'
+
+
+# Seconds the manager dashboard-data payload is shared between polls
+MANAGER_DASHBOARD_CACHE_SECONDS = int(os.getenv('MANAGER_DASHBOARD_CACHE_SECONDS', '5'))
+
+# Email outbox: emails are queued in EmailOutbox and sent in batches, one
+# SMTP connection per batch, by a single `python manage.py drain_email_outbox
+# --loop` worker. EMAIL_OUTBOX_RATE holds only for one sender, so turn
+# EMAIL_OUTBOX_AUTO_DRAIN on (drain inside the web process) only when the
+# site runs as a single process.
+EMAIL_OUTBOX_AUTO_DRAIN = os.getenv('EMAIL_OUTBOX_AUTO_DRAIN', 'False') == 'True'
+EMAIL_OUTBOX_BATCH_SIZE = 100
+EMAIL_OUTBOX_RATE = float(os.getenv('EMAIL_OUTBOX_RATE', '10'))  # emails per second
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_SECONDS = 60  # doubled after each failed attempt
+
+# Smoke sensor: a background thread reads the serial port into memory. Start
+# it inside the web process (single-process deployments only) with
+# SMOKE_READER_AUTOSTART=True, or run `python manage.py run_smoke_reader`.
+SMOKE_READER_AUTOSTART = os.getenv('SMOKE_READER_AUTOSTART', 'False') == 'True'
+SMOKE_READER_BUFFER_SIZE = 600  # readings kept in memory
+# Readings are stored with one bulk INSERT per batch of this many, or after
+# this many milliseconds, whichever comes first
+SMOKE_WRITE_BATCH_SIZE = int(os.getenv('SMOKE_WRITE_BATCH_SIZE', '50'))
+SMOKE_WRITE_FLUSH_MS = int(os.getenv('SMOKE_WRITE_FLUSH_MS', '1000'))
+SMOKE_WRITE_MAX_PENDING = 10000  # readings kept for retry while the database is unavailable
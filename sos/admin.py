@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import EmergencyRequest
+from .models import EmergencyRequest, Facility
 
 # Register your models here.
 admin.site.register(EmergencyRequest)
+
+@admin.register(Facility)
+class FacilityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'facility_type', 'address', 'source', 'updated_at')
+    list_filter = ('facility_type', 'source')
+    search_fields = ('name', 'address')
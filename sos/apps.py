@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class SosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'sos'
+
+    def ready(self):
+        # Connect the signal handlers that keep the facility index fresh
+        from . import facilities  # noqa: F401
+        from .guidance import warm_guidance_cache
+        warm_guidance_cache()
@@ -0,0 +1,27 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.background import submit
+
+# SOS work never shares the background pool, so bulk jobs there (email
+# drains, notification fan-out, reports) cannot queue ahead of an emergency.
+# Facility lookups, which the response waits on, also get a pool of their
+# own so that slow Gemini calls for personalized guidance cannot delay them.
+facility_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SOS_FACILITY_WORKERS', '4')),
+    thread_name_prefix='sos-facility',
+)
+sos_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('SOS_WORKERS', '4')),
+    thread_name_prefix='sos',
+)
+
+
+def run_facility_lookup(func, *args, **kwargs):
+    """Run a nearest-facility lookup on the dedicated pool and return its Future"""
+    return submit(facility_executor, func, *args, **kwargs)
+
+
+def run_sos_task(func, *args, **kwargs):
+    """Run other SOS follow-up work, such as guidance and late patches, and return its Future"""
+    return submit(sos_executor, func, *args, **kwargs)
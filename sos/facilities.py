@@ -0,0 +1,291 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utils.background import run_in_background
+from utils.cache import SimpleCache
+from utils.geo import PointIndex, geohash_encode, geohash_neighbours, haversine_km
+from utils.maps_keys import maps_key_pool
+from .models import Facility
+
+logger = logging.getLogger(__name__)
+
+# Precision 6 cells are roughly 1.2km x 0.6km, small enough that the nearest
+# facility for one point in a cell is a good answer for its neighbours too
+FACILITY_CELL_PRECISION = 6
+
+PLACES_NEARBY_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+
+# Facility locations rarely change, so cached lookups can live for a while
+facility_cache = SimpleCache(default_ttl=6 * 3600)
+# A cell is enriched from Places at most once in this many seconds
+ENRICHMENT_INTERVAL = 6 * 3600
+
+
+def facility_type_for(emergency_type):
+    """Map an EmergencyRequest.emergency_type to a Places facility type"""
+    if emergency_type == 'MEDICAL':
+        return 'hospital'
+    if emergency_type == 'FIRE':
+        return 'fire_station'
+    return 'police'
+
+
+def search_places(latitude, longitude, facility_type):
+    """Query the Places API for facilities within 5km of a point.
+
+    Returns the response data, or None if no API key produced a response.
+    """
+    logger.debug(f"Querying Places API for {facility_type} near {latitude},{longitude}")
+    params = {
+        'location': f"{latitude},{longitude}",
+        'radius': '5000',  # 5km radius
+        'type': facility_type,
+    }
+    api_key, data = maps_key_pool.request(PLACES_NEARBY_URL, params, timeout=5)
+    return data
+
+
+def facilities_from_places(places_data):
+    """Reduce a Places nearbysearch response to the fields we store"""
+    facilities = []
+    for result in places_data.get('results', []):
+        try:
+            facilities.append({
+                'place_id': result.get('place_id'),
+                'name': result['name'],
+                'address': result.get('vicinity', ''),
+                'latitude': result['geometry']['location']['lat'],
+                'longitude': result['geometry']['location']['lng'],
+            })
+        except (KeyError, TypeError):
+            continue
+    return facilities
+
+
+def nearest_of(facilities, latitude, longitude):
+    """Return the facility closest to the given point, or None"""
+    if not facilities:
+        return None
+    return min(
+        facilities,
+        key=lambda f: haversine_km(latitude, longitude, f['latitude'], f['longitude'])
+    )
+
+
+def _cell_key(facility_type, cell):
+    return f"facilities:{facility_type}:{cell}"
+
+
+def get_cached_facilities(latitude, longitude, facility_type):
+    """Look up cached facilities for the point's geohash cell or its neighbours.
+
+    Returns the cached facility list, or None on a miss.
+    """
+    cell = geohash_encode(latitude, longitude, FACILITY_CELL_PRECISION)
+    for candidate in [cell] + geohash_neighbours(cell):
+        facilities = facility_cache.get(_cell_key(facility_type, candidate))
+        if facilities is not None:
+            logger.debug(f"Facility cache hit for {facility_type} in cell {candidate}")
+            return facilities
+    return None
+
+
+def cache_facilities(latitude, longitude, facility_type, facilities):
+    cell = geohash_encode(latitude, longitude, FACILITY_CELL_PRECISION)
+    facility_cache.set(_cell_key(facility_type, cell), facilities)
+
+
+def find_nearest_facility(latitude, longitude, facility_type):
+    """Find the nearest facility of a type, serving nearby lookups from memory.
+
+    The Places API is only queried when neither the point's cell nor any of
+    its neighbours has a cached result. Failed lookups are not cached.
+    """
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+
+    facilities = get_cached_facilities(latitude, longitude, facility_type)
+    if facilities is None:
+        places_data = search_places(latitude, longitude, facility_type)
+        if places_data is None:
+            return None
+        facilities = facilities_from_places(places_data)
+        cache_facilities(latitude, longitude, facility_type, facilities)
+
+    return nearest_of(facilities, latitude, longitude)
+
+
+class FacilityRegistryIndex:
+    """In-memory KD-tree per facility type over the local Facility registry.
+
+    A type's tree is built on its first lookup. After that, trees older than
+    `max_age` seconds (so imports run from another process are picked up)
+    and trees whose registry rows changed in this process are rebuilt on the
+    background pool, while lookups keep using the current tree.
+    """
+
+    def __init__(self, max_age=600):
+        self.max_age = max_age
+        self._trees = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def invalidate(self, facility_type=None):
+        """Drop the tree for one facility type, or every tree"""
+        with self._lock:
+            if facility_type is None:
+                self._trees = {}
+            else:
+                self._trees.pop(facility_type, None)
+
+    def _build(self, facility_type):
+        rows = Facility.objects.filter(facility_type=facility_type).values_list(
+            'latitude', 'longitude', 'name', 'address', 'phone'
+        )
+        tree = PointIndex(
+            (lat, lng, {'name': name, 'address': address, 'phone': phone,
+                        'latitude': lat, 'longitude': lng})
+            for lat, lng, name, address, phone in rows
+        )
+        logger.debug(f"Built {facility_type} index with {len(tree)} facilities")
+        return tree
+
+    def refresh(self, facility_type):
+        """Rebuild one type's tree and swap it in; lookups keep using the old one meanwhile"""
+        tree = self._build(facility_type)
+        with self._lock:
+            self._trees[facility_type] = (time.monotonic(), tree)
+
+    def _refresh_in_background(self, facility_type):
+        try:
+            self.refresh(facility_type)
+        finally:
+            with self._lock:
+                self._refreshing.discard(facility_type)
+
+    def schedule_refresh(self, facility_type):
+        """Rebuild one type's tree on the background pool, unless a rebuild is already queued"""
+        with self._lock:
+            if facility_type in self._refreshing:
+                return
+            self._refreshing.add(facility_type)
+        run_in_background(self._refresh_in_background, facility_type)
+
+    def _tree(self, facility_type):
+        entry = self._trees.get(facility_type)
+        if entry is not None:
+            if time.monotonic() - entry[0] >= self.max_age:
+                self.schedule_refresh(facility_type)
+            return entry[1]
+
+        # Only the very first lookup of a type waits for a build
+        with self._lock:
+            entry = self._trees.get(facility_type)
+            if entry is not None:
+                return entry[1]
+            tree = self._build(facility_type)
+            self._trees[facility_type] = (time.monotonic(), tree)
+            return tree
+
+    def nearest(self, latitude, longitude, facility_type, k=1, max_km=None):
+        """Return up to k facilities of a type, closest first, with distance_km set"""
+        matches = self._tree(facility_type).nearest(latitude, longitude, k=k, max_km=max_km)
+        return [dict(payload, distance_km=round(distance, 2)) for distance, payload in matches]
+
+
+facility_index = FacilityRegistryIndex()
+
+
+@receiver(post_save, sender=Facility)
+@receiver(post_delete, sender=Facility)
+def _refresh_facility_index(sender, instance, **kwargs):
+    # Rebuilt once the change is committed; lookups keep the old tree until then
+    transaction.on_commit(lambda: facility_index.schedule_refresh(instance.facility_type))
+
+
+def upsert_facilities(facility_type, facilities, source='places'):
+    """Insert or refresh registry rows for facilities that carry an external id"""
+    objs = [
+        Facility(
+            name=f['name'][:200],
+            facility_type=facility_type,
+            address=(f.get('address') or '')[:255],
+            latitude=f['latitude'],
+            longitude=f['longitude'],
+            source=source,
+            external_id=f['place_id'],
+        )
+        for f in facilities if f.get('place_id')
+    ]
+    if not objs:
+        return 0
+    Facility.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=['external_id'],
+        update_fields=['name', 'address', 'latitude', 'longitude', 'updated_at'],
+    )
+    # Called from the background pool, so the rebuild never runs inside an SOS request
+    facility_index.refresh(facility_type)
+    return len(objs)
+
+
+def claim_enrichment(latitude, longitude, facility_type):
+    """Return True if the point's cell is due for Places enrichment, marking it as done.
+
+    Stops every registry hit in a busy cell from queueing another Places
+    query and registry rebuild.
+    """
+    key = f"enriched:{_cell_key(facility_type, geohash_encode(latitude, longitude, FACILITY_CELL_PRECISION))}"
+    if facility_cache.get(key) is not None:
+        return False
+    facility_cache.set(key, True, ttl=ENRICHMENT_INTERVAL)
+    return True
+
+
+def enrich_from_places(latitude, longitude, facility_type):
+    """Fetch Places results for a cell not seen recently and add them to the registry"""
+    if get_cached_facilities(latitude, longitude, facility_type) is not None:
+        return 0
+    places_data = search_places(latitude, longitude, facility_type)
+    if places_data is None:
+        return 0
+    facilities = facilities_from_places(places_data)
+    cache_facilities(latitude, longitude, facility_type, facilities)
+    return upsert_facilities(facility_type, facilities)
+
+
+def locate_nearest_facility(latitude, longitude, facility_type):
+    """Answer a nearest-facility query from the local registry when possible.
+
+    Falls back to the cached Places lookup only when the registry has no
+    facility of this type within range. When SOS_PLACES_ENRICHMENT is on,
+    Places results are folded back into the registry in the background.
+    """
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+
+    enrich = getattr(settings, 'SOS_PLACES_ENRICHMENT', True)
+    max_km = getattr(settings, 'SOS_FACILITY_MAX_KM', 25)
+
+    matches = facility_index.nearest(latitude, longitude, facility_type, max_km=max_km)
+    if matches:
+        if enrich and claim_enrichment(latitude, longitude, facility_type):
+            run_in_background(enrich_from_places, latitude, longitude, facility_type)
+        return matches[0]
+
+    nearest = find_nearest_facility(latitude, longitude, facility_type)
+    if nearest is not None and enrich and claim_enrichment(latitude, longitude, facility_type):
+        facilities = get_cached_facilities(latitude, longitude, facility_type) or []
+        run_in_background(upsert_facilities, facility_type, facilities)
+    return nearest
@@ -0,0 +1,100 @@
+import hashlib
+import re
+
+from utils.cache import SimpleCache
+
+# Vetted first-response guidance per EmergencyRequest.emergency_type, warmed
+# into the guidance cache at startup and served until a personalized answer exists
+FALLBACK_GUIDANCE = {
+    'MEDICAL': (
+        "Help is on the way. Stay calm and stay with the person.\n"
+        "1. Call 108 (ambulance) or 112 if you have not already.\n"
+        "2. Check that the person is conscious and breathing. If they are not "
+        "breathing, start chest compressions if you are trained.\n"
+        "3. Press firmly on any heavy bleeding with a clean cloth.\n"
+        "4. Do not move them unless they are in immediate danger.\n"
+        "5. Keep them warm and comfortable, and note when symptoms started."
+    ),
+    'FIRE': (
+        "Get everyone out and stay out.\n"
+        "1. Call 101 (fire brigade) or 112 once you are safe.\n"
+        "2. Leave the building immediately. Do not use lifts.\n"
+        "3. Stay low under the smoke and cover your nose and mouth.\n"
+        "4. Feel doors before opening them. Close doors behind you to slow the fire.\n"
+        "5. Do not go back inside for belongings. Meet at a safe point and "
+        "tell responders if anyone is missing."
+    ),
+    'POLICE': (
+        "Your safety comes first.\n"
+        "1. Call 100 (police) or 112 if you can do so safely.\n"
+        "2. Move to a safe, well-lit place and lock doors if you are indoors.\n"
+        "3. Do not confront anyone involved.\n"
+        "4. Note descriptions, vehicle numbers and the direction people went.\n"
+        "5. Keep your phone on and wait for officers to contact you."
+    ),
+    'OTHER': (
+        "Stay calm and move away from any immediate danger.\n"
+        "1. Call 112 and describe exactly where you are.\n"
+        "2. Help others only if it is safe for you to do so.\n"
+        "3. Follow instructions from local authorities and responders.\n"
+        "4. Keep your phone charged and your location sharing on."
+    ),
+}
+
+
+# Words that carry no meaning for the kind of help needed
+STOPWORDS = {
+    'the', 'and', 'for', 'with', 'has', 'have', 'had', 'was', 'are', 'is', 'been',
+    'there', 'here', 'this', 'that', 'from', 'into', 'our', 'his', 'her', 'their',
+    'its', 'not', 'but', 'can', 'please', 'help', 'need', 'urgent', 'someone',
+    'some', 'very', 'just', 'now', 'near', 'getting', 'got', 'get', 'who', 'what',
+}
+
+# Guidance lives for a day; vetted entries are re-warmed on every startup
+guidance_cache = SimpleCache(default_ttl=24 * 3600)
+
+
+def fallback_guidance(emergency_type):
+    """Return the vetted guidance text for an emergency type"""
+    return FALLBACK_GUIDANCE.get(emergency_type, FALLBACK_GUIDANCE['OTHER'])
+
+
+def description_fingerprint(description):
+    """Normalize a description to a short fingerprint of its keywords.
+
+    Word order, punctuation, case, repeated words and filler words are
+    ignored, so "House on fire!!" and "fire in the house" share a fingerprint.
+    Every keyword counts: personalized guidance is only reused for a
+    description with exactly the same keywords, never one that merely
+    shares its first few.
+    """
+    words = re.findall(r'[a-z]+', (description or '').lower())
+    keywords = sorted({w for w in words if len(w) > 2 and w not in STOPWORDS})
+    return hashlib.sha1(' '.join(keywords).encode('utf-8')).hexdigest()[:16]
+
+
+def _key(emergency_type, fingerprint):
+    return f"guidance:{emergency_type}:{fingerprint}"
+
+
+def warm_guidance_cache():
+    """Load the vetted guidance for every emergency type into the cache"""
+    for emergency_type, text in FALLBACK_GUIDANCE.items():
+        guidance_cache.set(_key(emergency_type, ''), text, ttl=365 * 24 * 3600)
+
+
+def get_guidance(emergency_type, description):
+    """Return (guidance, personalized) for an emergency from the cache.
+
+    A personalized response generated earlier for a matching description is
+    preferred, otherwise the vetted guidance for the type is returned.
+    """
+    cached = guidance_cache.get(_key(emergency_type, description_fingerprint(description)))
+    if cached is not None:
+        return cached, True
+    vetted = guidance_cache.get(_key(emergency_type, ''))
+    return (vetted or fallback_guidance(emergency_type)), False
+
+
+def cache_personalized_guidance(emergency_type, description, text):
+    guidance_cache.set(_key(emergency_type, description_fingerprint(description)), text)
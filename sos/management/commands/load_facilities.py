@@ -0,0 +1,119 @@
+import csv
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from sos.facilities import facility_index
+from sos.models import Facility
+
+# Accept common spellings used by municipal datasets and OpenStreetMap exports
+TYPE_ALIASES = {
+    'hospital': 'hospital',
+    'clinic': 'hospital',
+    'fire_station': 'fire_station',
+    'fire station': 'fire_station',
+    'fire': 'fire_station',
+    'police': 'police',
+    'police_station': 'police',
+    'police station': 'police',
+}
+
+
+class Command(BaseCommand):
+    help = 'Bulk load emergency facilities into the local registry from a CSV or GeoJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or GeoJSON file to import')
+        parser.add_argument('--type', dest='default_type',
+                            help='Facility type for rows that do not specify one')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete previously imported facilities before loading')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f"File not found: {path}")
+
+        if path.suffix.lower() in ('.geojson', '.json'):
+            rows = self.read_geojson(path)
+        elif path.suffix.lower() == '.csv':
+            rows = self.read_csv(path)
+        else:
+            raise CommandError('Expected a .csv, .json or .geojson file')
+
+        facilities, skipped = [], 0
+        for row in rows:
+            facility = self.to_facility(row, options['default_type'])
+            if facility is None:
+                skipped += 1
+            else:
+                facilities.append(facility)
+
+        with transaction.atomic():
+            if options['replace']:
+                deleted, _ = Facility.objects.filter(source='import').delete()
+                self.stdout.write(f"Removed {deleted} previously imported facilities")
+
+            # Rows with an upstream id are upserted, the rest are plain inserts
+            keyed = [f for f in facilities if f.external_id]
+            unkeyed = [f for f in facilities if not f.external_id]
+            Facility.objects.bulk_create(
+                keyed,
+                batch_size=options['batch_size'],
+                update_conflicts=True,
+                unique_fields=['external_id'],
+                update_fields=['name', 'facility_type', 'address', 'phone',
+                               'latitude', 'longitude', 'updated_at'],
+            )
+            Facility.objects.bulk_create(unkeyed, batch_size=options['batch_size'])
+
+        facility_index.invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Loaded {len(facilities)} facilities ({skipped} rows skipped)"
+        ))
+
+    def read_csv(self, path):
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            for row in csv.DictReader(f):
+                yield {k.strip().lower(): (v or '').strip() for k, v in row.items() if k}
+
+    def read_geojson(self, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        for feature in data.get('features', []):
+            geometry = feature.get('geometry') or {}
+            if geometry.get('type') != 'Point':
+                continue
+            longitude, latitude = geometry['coordinates'][:2]
+            props = {k.lower(): v for k, v in (feature.get('properties') or {}).items()}
+            props.setdefault('latitude', latitude)
+            props.setdefault('longitude', longitude)
+            props.setdefault('id', feature.get('id'))
+            yield props
+
+    def to_facility(self, row, default_type):
+        raw_type = row.get('facility_type') or row.get('type') or row.get('amenity') or default_type
+        facility_type = TYPE_ALIASES.get(str(raw_type or '').strip().lower())
+        try:
+            latitude = float(row.get('latitude') or row.get('lat'))
+            longitude = float(row.get('longitude') or row.get('lng') or row.get('lon'))
+        except (TypeError, ValueError):
+            return None
+        name = str(row.get('name') or '').strip()
+        if not facility_type or not name:
+            return None
+
+        external_id = row.get('external_id') or row.get('id')
+        return Facility(
+            name=name[:200],
+            facility_type=facility_type,
+            address=str(row.get('address') or row.get('addr:full') or '')[:255],
+            phone=str(row.get('phone') or '')[:30],
+            latitude=latitude,
+            longitude=longitude,
+            source='import',
+            external_id=str(external_id)[:255] if external_id else None,
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Facility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('facility_type', models.CharField(choices=[('hospital', 'Hospital'), ('fire_station', 'Fire Station'), ('police', 'Police Station')], db_index=True, max_length=20)),
+                ('address', models.CharField(blank=True, max_length=255)),
+                ('phone', models.CharField(blank=True, max_length=30)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('source', models.CharField(choices=[('import', 'Bulk Import'), ('places', 'Google Places')], default='import', max_length=20)),
+                ('external_id', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'facilities',
+            },
+        ),
+    ]
@@ -22,3 +22,32 @@ class EmergencyRequest(models.Model):
 
     def __str__(self):
         return f"{self.emergency_type} - {self.user.username}"
+
+class Facility(models.Model):
+    FACILITY_TYPES = [
+        ('hospital', 'Hospital'),
+        ('fire_station', 'Fire Station'),
+        ('police', 'Police Station'),
+    ]
+
+    SOURCES = [
+        ('import', 'Bulk Import'),
+        ('places', 'Google Places'),
+    ]
+
+    name = models.CharField(max_length=200)
+    facility_type = models.CharField(max_length=20, choices=FACILITY_TYPES, db_index=True)
+    address = models.CharField(max_length=255, blank=True)
+    phone = models.CharField(max_length=30, blank=True)
+    latitude = models.FloatField()
+    longitude = models.FloatField()
+    source = models.CharField(max_length=20, choices=SOURCES, default='import')
+    # Identifier from the upstream dataset or the Places place_id, used to upsert
+    external_id = models.CharField(max_length=255, null=True, blank=True, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'facilities'
+
+    def __str__(self):
+        return f"{self.get_facility_type_display()} - {self.name}"
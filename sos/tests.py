@@ -1,3 +1,52 @@
+import time
+from unittest import mock
+
 from django.test import TestCase
 
-# Create your tests here.
+from .facilities import FacilityRegistryIndex, facility_index
+from .models import Facility
+
+
+@mock.patch('sos.facilities.run_in_background')
+class FacilityRegistryIndexTests(TestCase):
+    """Registry changes and expiry rebuild the index off the request path"""
+
+    @classmethod
+    def setUpTestData(cls):
+        Facility.objects.create(name='City Hospital', facility_type='hospital', latitude=19.07, longitude=72.87)
+
+    def setUp(self):
+        facility_index.invalidate()
+
+    def nearest_name(self, index):
+        return index.nearest(19.08, 72.88, 'hospital')[0]['name']
+
+    def test_save_refreshes_in_background(self, run_in_background):
+        self.assertEqual(self.nearest_name(facility_index), 'City Hospital')
+        with self.captureOnCommitCallbacks(execute=True):
+            Facility.objects.create(name='Clinic', facility_type='hospital', latitude=19.08, longitude=72.88)
+
+        run_in_background.assert_called_once_with(facility_index._refresh_in_background, 'hospital')
+        # Lookups keep the current tree until the rebuild has run
+        with mock.patch.object(facility_index, '_build', side_effect=AssertionError('built on request')):
+            self.assertEqual(self.nearest_name(facility_index), 'City Hospital')
+
+        func, facility_type = run_in_background.call_args.args
+        func(facility_type)
+        self.assertEqual(self.nearest_name(facility_index), 'Clinic')
+
+    def test_expired_tree_is_served_while_rebuilding(self, run_in_background):
+        index = FacilityRegistryIndex(max_age=60)
+        self.assertEqual(self.nearest_name(index), 'City Hospital')
+        built_at, tree = index._trees['hospital']
+        index._trees['hospital'] = (built_at - 61, tree)
+
+        with mock.patch.object(index, '_build', side_effect=AssertionError('built on request')):
+            self.assertEqual(self.nearest_name(index), 'City Hospital')
+            self.assertEqual(self.nearest_name(index), 'City Hospital')
+        # Both expired lookups share one queued rebuild
+        run_in_background.assert_called_once_with(index._refresh_in_background, 'hospital')
+
+        index._refresh_in_background('hospital')
+        self.assertGreater(index._trees['hospital'][0], time.monotonic() - 5)
+        self.assertFalse(index._refreshing)
@@ -6,4 +6,5 @@ app_name = 'sos'  # add namespace
 urlpatterns = [
     path('emergency/', views.emergency_assistance, name='emergency'),
     path('emergency/submit/', views.submit_emergency, name='submit_emergency'),
+    path('emergency/<int:emergency_id>/status/', views.emergency_status, name='emergency_status'),
 ]
@@ -3,73 +3,64 @@ from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 import google.generativeai as genai
-import requests
 from .models import EmergencyRequest
 import json
 import logging
 import random
 import os
 from django.conf import settings
-from utils.cache import cached, working_api_key_cache, maps_api_cache
+from utils.maps_keys import maps_key_pool
+from .facilities import facility_type_for, locate_nearest_facility
+from .guidance import cache_personalized_guidance, get_guidance
+from .background import run_facility_lookup, run_sos_task
+from concurrent.futures import wait
 
 logger = logging.getLogger(__name__)
 
 # Get API keys from environment variables
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
 
-# Google Maps API configuration - set to None to disable Google Maps features
-GOOGLE_MAPS_API_KEYS = [os.getenv('GOOGLE_MAPS_API_KEY')] if os.getenv('GOOGLE_MAPS_API_KEY') else None
-
-@cached(working_api_key_cache, key_prefix='working_maps_api')
-def get_working_maps_api_key(latitude, longitude, facility_type):
-    """
-    Try each API key until finding one that works for the Places API request.
-    Returns tuple of (working_key, response_data) or (None, None) if no keys work.
-    
-    This function is cached to avoid repeated API calls for the same parameters.
-    """
-    logger.debug(f"Checking working Maps API key for {latitude},{longitude}, {facility_type}")
-    base_url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-    
-    # Check cache for this specific request
-    cache_key = f"places:{latitude},{longitude}:{facility_type}"
-    cached_response = maps_api_cache.get(cache_key)
-    if cached_response is not None:
-        logger.debug(f"Using cached Places API response for {cache_key}")
-        return cached_response[0], cached_response[1]
-    
-    for api_key in GOOGLE_MAPS_API_KEYS:
-        try:
-            params = {
-                'location': f"{latitude},{longitude}",
-                'radius': '5000',  # 5km radius
-                'type': facility_type,
-                'key': api_key
-            }
-            
-            response = requests.get(base_url, params=params)
-            data = response.json()
-            
-            if response.status_code == 200 and data.get('status') != 'OVER_QUERY_LIMIT':
-                # Cache the successful response
-                maps_api_cache.set(cache_key, (api_key, data))
-                return api_key, data
-                
-        except Exception as e:
-            logger.error(f"Error with Maps API key {api_key}: {str(e)}")
-            continue
-            
-    return None, None
 
 @login_required
 def emergency_assistance(request):
-    # Use Nashik coordinates as default (19.9975, 73.7898)
-    # This will be overridden by the user's actual location when they use the emergency page
-    api_key = get_working_maps_api_key(19.9975, 73.7898, 'hospital')[0]
-    if not api_key:
-        api_key = GOOGLE_MAPS_API_KEYS[0]  # Fallback to the first key if all failed
-        
-    return render(request, 'sos/emergency.html', {'google_maps_api_key': api_key})
+    # The key pool already knows which keys are healthy, so there is no need
+    # to spend a Places request just to find a working one
+    return render(request, 'sos/emergency.html', {'google_maps_api_key': maps_key_pool.best_key()})
+
+def generate_ai_response(emergency_type, description):
+    """Ask Gemini for first-response guidance for an emergency"""
+    genai.configure(api_key=GEMINI_API_KEY)
+    model = genai.GenerativeModel('gemini-1.5-flash')
+    prompt = f"Emergency situation: {emergency_type}. Details: {description}. Provide a calm, helpful response with immediate steps to take."
+    response = model.generate_content(
+        prompt,
+        request_options={'timeout': getattr(settings, 'SOS_AI_TIMEOUT', 20)}
+    )
+    return response.text
+
+def personalize_guidance(emergency_type, description):
+    """Generate tailored guidance and remember it for similar descriptions"""
+    try:
+        text = generate_ai_response(emergency_type, description)
+    except Exception as e:
+        logger.error(f"Gemini API error: {str(e)}")
+        return None
+    if text:
+        cache_personalized_guidance(emergency_type, description, text)
+    return text
+
+def patch_emergency_when_ready(future, emergency_id, field):
+    """Store a late upstream result on the saved EmergencyRequest once it arrives"""
+    def on_done(f):
+        if f.cancelled() or f.exception() is not None:
+            return
+        value = f.result()
+        if value:
+            run_sos_task(
+                lambda: EmergencyRequest.objects.filter(pk=emergency_id).update(**{field: value})
+            )
+            logger.info(f"Patched late {field} onto emergency request {emergency_id}")
+    future.add_done_callback(on_done)
 
 @login_required
 @csrf_exempt
@@ -82,41 +73,31 @@ def submit_emergency(request):
             latitude = data.get('latitude')
             longitude = data.get('longitude')
 
-            # Configure Gemini API
-            genai.configure(api_key=GEMINI_API_KEY)
-            model = genai.GenerativeModel('gemini-1.5-flash')
-
-            # Generate AI response with error handling
-            try:
-                prompt = f"Emergency situation: {emergency_type}. Details: {description}. Provide a calm, helpful response with immediate steps to take."
-                response = model.generate_content(prompt)
-                ai_response = response.text
-            except Exception as e:
-                logger.error(f"Gemini API error: {str(e)}")
-                ai_response = "I apologize, but I'm having trouble generating a response. Please contact emergency services immediately if this is a serious situation."
-
-            # Find nearest facility using Google Places API with key rotation
-            facility_type = 'hospital' if emergency_type == 'MEDICAL' else 'fire_station' if emergency_type == 'FIRE' else 'police'
-            
-            # Get a working API key and response
-            working_key, places_response_data = get_working_maps_api_key(latitude, longitude, facility_type)
-            
-            # Process the response
-            if working_key and places_response_data:
-                results = places_response_data.get('results', [])
-                if results:
-                    nearest = results[0]
-                    nearest_facility = {
-                        'name': nearest['name'],
-                        'address': nearest.get('vicinity', ''),
-                        'latitude': nearest['geometry']['location']['lat'],
-                        'longitude': nearest['geometry']['location']['lng']
-                    }
-                else:
-                    nearest_facility = None
+            # The first response always comes from the guidance cache, which
+            # holds vetted text per type and earlier personalized answers
+            ai_response, personalized = get_guidance(emergency_type, description)
+            ai_future = None
+            if not personalized and getattr(settings, 'SOS_LLM_PERSONALIZATION', True):
+                ai_future = run_sos_task(personalize_guidance, emergency_type, description)
+
+            # Never wait on the facility lookup longer than the per-request deadline
+            facility_type = facility_type_for(emergency_type)
+            facility_future = run_facility_lookup(locate_nearest_facility, latitude, longitude, facility_type)
+            wait([facility_future], timeout=getattr(settings, 'SOS_RESPONSE_DEADLINE', 3.0))
+
+            # Personalized guidance is a follow-up patched onto the request
+            pending = ['ai_response'] if ai_future is not None else []
+
+            if facility_future.done() and facility_future.exception() is None:
+                nearest_facility = facility_future.result()
             else:
+                if facility_future.done():
+                    logger.error(f"Facility lookup error: {str(facility_future.exception())}")
+                else:
+                    pending.append('nearest_facility')
                 nearest_facility = None
-                logger.error("Could not find a working Google Maps API key")
+            if nearest_facility is None and 'nearest_facility' not in pending:
+                logger.error(f"Could not find a nearby {facility_type}")
 
             # Save emergency request
             emergency = EmergencyRequest.objects.create(
@@ -129,10 +110,18 @@ def submit_emergency(request):
                 nearest_facility=nearest_facility
             )
 
+            # Late results are written to the stored request when they arrive
+            if 'ai_response' in pending:
+                patch_emergency_when_ready(ai_future, emergency.id, 'ai_response')
+            if 'nearest_facility' in pending:
+                patch_emergency_when_ready(facility_future, emergency.id, 'nearest_facility')
+
             return JsonResponse({
                 'success': True,
+                'emergency_id': emergency.id,
                 'ai_response': ai_response,
-                'nearest_facility': nearest_facility
+                'nearest_facility': nearest_facility,
+                'pending': pending
             })
 
         except Exception as e:
@@ -143,3 +132,17 @@ def submit_emergency(request):
             }, status=500)
 
     return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=400)
+
+@login_required
+def emergency_status(request, emergency_id):
+    """Return the stored response for an emergency, including late results"""
+    try:
+        emergency = EmergencyRequest.objects.get(id=emergency_id, user=request.user)
+    except EmergencyRequest.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Emergency request not found'}, status=404)
+
+    return JsonResponse({
+        'success': True,
+        'ai_response': emergency.ai_response,
+        'nearest_facility': emergency.nearest_facility
+    })
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import UserProfile, Complaint, Notification
+from django.db import transaction
+from .models import UserProfile, Complaint, Notification, Broadcast
 
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
@@ -9,10 +10,12 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Complaint)
 class ComplaintAdmin(admin.ModelAdmin):
-    list_display = ('title', 'user', 'complaint_type', 'status', 'created_at')
+    list_display = ('title', 'user', 'complaint_type', 'status', 'duplicate_of', 'created_at')
     list_filter = ('complaint_type', 'status', 'created_at')
     search_fields = ('title', 'description', 'user__username')
     readonly_fields = ('created_at', 'updated_at', 'ai_classification')
+    raw_id_fields = ('duplicate_of',)
+    list_select_related = ('user', 'duplicate_of__user')
     list_editable = ('status',)
     
     fieldsets = (
@@ -23,7 +26,7 @@ class ComplaintAdmin(admin.ModelAdmin):
             'fields': ('latitude', 'longitude')
         }),
         ('Status & Classification', {
-            'fields': ('status', 'ai_classification')
+            'fields': ('status', 'ai_classification', 'duplicate_of')
         }),
         ('Media', {
             'fields': ('image',)
@@ -34,9 +37,34 @@ class ComplaintAdmin(admin.ModelAdmin):
         })
     )
 
+    def save_model(self, request, obj, form, change):
+        from manager.models import ComplaintDailyStats, ComplaintStatusEvent
+
+        with transaction.atomic():
+            old_status = old_type = None
+            if change:
+                # Lock the row so a concurrent manager update cannot slip in between
+                old_status, old_type = Complaint.objects.select_for_update().filter(
+                    pk=obj.pk
+                ).values_list('status', 'complaint_type').get()
+            super().save_model(request, obj, form, change)
+            # Edits made here bypass the manager views, so keep the rollup and
+            # event log in step with both status and type changes
+            if change and (old_status != obj.status or old_type != obj.complaint_type):
+                ComplaintDailyStats.record_transition(obj, old_status, obj.status, old_type=old_type)
+            if change and old_status != obj.status:
+                ComplaintStatusEvent.record(obj, old_status, obj.status, changed_by=request.user)
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ('title', 'user', 'notification_type', 'is_read', 'created_at')
     list_filter = ('notification_type', 'is_read', 'created_at')
     search_fields = ('title', 'message', 'user__username')
     readonly_fields = ('created_at',)
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ('title', 'notification_type', 'created_by', 'created_at')
+    list_filter = ('notification_type', 'created_at')
+    search_fields = ('title', 'message')
+    readonly_fields = ('created_at',)
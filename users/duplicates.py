@@ -0,0 +1,73 @@
+import math
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from utils.geo import (
+    EARTH_RADIUS_KM, geohash_bbox, geohash_encode, geohash_neighbours, geohash_range, haversine_km,
+)
+from utils.simhash import hamming_distance, simhash
+
+from .models import Complaint
+
+# Finest geohash precision tried; coarser cells are used where these are
+# narrower than the radius, so the cell and its neighbours always cover it
+DUPLICATE_CELL_PRECISION = 7
+DUPLICATE_RADIUS_KM = 0.15
+# Fingerprints differing in at most this many of 64 bits count as the same text
+DUPLICATE_MAX_DISTANCE = 16
+DUPLICATE_WINDOW = timedelta(days=30)
+# Upper bound on rows compared, so a busy corner cannot slow submission down
+DUPLICATE_MAX_CANDIDATES = 500
+
+
+def covering_precision(latitude, radius_km, max_precision=DUPLICATE_CELL_PRECISION):
+    """Finest geohash precision whose cells are at least radius_km wide and high at latitude.
+
+    Cells narrow towards the poles (a precision 7 cell is about 143m wide at
+    20 degrees), so a fixed precision can leave part of the radius outside
+    the 3x3 block of cells searched.
+    """
+    # Measure at the poleward edge of the search area, where cells are narrowest
+    edge = min(abs(latitude) + math.degrees(radius_km / EARTH_RADIUS_KM), 89.9)
+    for precision in range(max_precision, 0, -1):
+        south, west, north, east = geohash_bbox(geohash_encode(edge, 0, precision))
+        height = math.radians(north - south) * EARTH_RADIUS_KM
+        width = math.radians(east - west) * EARTH_RADIUS_KM * math.cos(math.radians(edge))
+        if min(height, width) >= radius_km:
+            return precision
+    return 1
+
+
+def find_duplicate(title, description, latitude, longitude, complaint_type):
+    """Return the open complaint this report most likely repeats, or None.
+
+    Candidates are recent, open, original complaints of the same type in the
+    surrounding geohash cells, each cell read as a (complaint_type, geohash)
+    index range, newest first. The closest SimHash within
+    DUPLICATE_MAX_DISTANCE bits and DUPLICATE_RADIUS_KM wins.
+    """
+    cell = geohash_encode(latitude, longitude, covering_precision(latitude, DUPLICATE_RADIUS_KM))
+    nearby = Q()
+    for prefix in [cell] + geohash_neighbours(cell):
+        low, high = geohash_range(prefix)
+        # The type goes in every branch so each one is a single index seek
+        nearby |= Q(complaint_type=complaint_type, geohash__gte=low, geohash__lt=high)
+
+    candidates = (
+        Complaint.objects.filter(nearby)
+        .filter(created_at__gte=timezone.now() - DUPLICATE_WINDOW, duplicate_of__isnull=True,
+                simhash__isnull=False)
+        .exclude(status='RESOLVED')
+        .order_by('-created_at')
+        .values_list('id', 'simhash', 'latitude', 'longitude')[:DUPLICATE_MAX_CANDIDATES]
+    )
+
+    fingerprint = simhash(f"{title} {description}")
+    best_id, best_distance = None, DUPLICATE_MAX_DISTANCE + 1
+    for complaint_id, other, lat, lng in candidates:
+        distance = hamming_distance(fingerprint, other)
+        if distance < best_distance and haversine_km(latitude, longitude, lat, lng) <= DUPLICATE_RADIUS_KM:
+            best_id, best_distance = complaint_id, distance
+    return Complaint.objects.get(pk=best_id) if best_id else None
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_trafficreport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Broadcast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=100)),
+                ('message', models.TextField()),
+                ('notification_type', models.CharField(choices=[('COMPLAINT', 'Complaint'), ('TRAFFIC', 'Traffic'), ('AIR_QUALITY', 'Air Quality'), ('WATER_SUPPLY', 'Water Supply'), ('EVENT', 'Event'), ('OTHER', 'Other'), ('ALERT', 'Alert')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='broadcasts_sent', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='BroadcastRead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('read_at', models.DateTimeField(auto_now_add=True)),
+                ('broadcast', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reads', to='users.broadcast')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='broadcast_reads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'broadcast')},
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:34
+
+from django.db import migrations, models
+
+from utils.geo import geohash_encode
+
+
+def backfill_geohash(apps, schema_editor):
+    UserProfile = apps.get_model('users', 'UserProfile')
+    profiles = UserProfile.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    batch = []
+    for profile in profiles.iterator():
+        profile.geohash = geohash_encode(profile.latitude, profile.longitude, 9)
+        batch.append(profile)
+        if len(batch) >= 1000:
+            UserProfile.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    UserProfile.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_broadcast_broadcastread'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
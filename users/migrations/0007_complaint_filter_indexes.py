@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_userprofile_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at'], name='users_compl_created_cb643e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['status', 'created_at'], name='users_compl_status_2f9485_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['complaint_type', 'created_at'], name='users_compl_complai_d09a6c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['complaint_type', 'status', 'created_at'], name='users_compl_complai_f7dfad_idx'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_complaint_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='users_compl_created_cb643e_idx',
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at', 'user'], name='users_compl_created_510142_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='users_notif_user_id_1be17e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at'], name='users_notif_user_id_c37f16_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='trafficreport',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['timestamp'], name='users_traffic_active_ts_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:42
+
+from django.db import migrations, models
+
+from utils.geo import geohash_encode
+
+
+def backfill_geohash(apps, schema_editor):
+    Complaint = apps.get_model('users', 'Complaint')
+    batch = []
+    for complaint in Complaint.objects.only('id', 'latitude', 'longitude').iterator():
+        complaint.geohash = geohash_encode(complaint.latitude, complaint.longitude, 9)
+        batch.append(complaint)
+        if len(batch) >= 1000:
+            Complaint.objects.bulk_update(batch, ['geohash'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['geohash', 'complaint_type', 'status'], name='users_compl_geohash_0e1679_idx'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-19 04:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from utils.simhash import simhash
+
+
+def backfill_simhash(apps, schema_editor):
+    Complaint = apps.get_model('users', 'Complaint')
+    batch = []
+    for complaint in Complaint.objects.only('id', 'title', 'description').iterator():
+        complaint.simhash = simhash(f"{complaint.title} {complaint.description}")
+        batch.append(complaint)
+        if len(batch) >= 1000:
+            Complaint.objects.bulk_update(batch, ['simhash'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['simhash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_complaint_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='duplicates', to='users.complaint'),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='simhash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['complaint_type', 'geohash'], name='users_compl_complai_df88db_idx'),
+        ),
+        migrations.RunPython(backfill_simhash, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,14 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.urls import reverse
+
+from utils.geo import geohash_encode
+from utils.simhash import simhash
+
+# Precision 9 cells are under 5m across, fine enough for any geofence
+PROFILE_GEOHASH_PRECISION = 9
+# The finest grid the complaints map aggregates to
+COMPLAINT_GEOHASH_PRECISION = 9
 
 # Create your models here.
 
@@ -8,9 +17,21 @@ class UserProfile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     latitude = models.FloatField(null=True, blank=True)
     longitude = models.FloatField(null=True, blank=True)
+    # Spatial index key for geofenced notifications, kept in sync in save()
+    geohash = models.CharField(max_length=12, blank=True, db_index=True)
     
     def __str__(self):
         return self.user.username
+    
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude, PROFILE_GEOHASH_PRECISION)
+        else:
+            self.geohash = ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
 
 class Complaint(models.Model):
     STATUS_CHOICES = [
@@ -38,10 +59,43 @@ class Complaint(models.Model):
     ai_classification = models.TextField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Grid cell key for map aggregation, kept in sync in save()
+    geohash = models.CharField(max_length=12, blank=True)
+    # Fingerprint of the title and description for near-duplicate detection
+    simhash = models.BigIntegerField(null=True, blank=True)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='duplicates')
+
+    class Meta:
+        # Match the manager complaint filters, which always sort newest first.
+        # (created_at, user) also covers the dashboard's active-user count.
+        indexes = [
+            models.Index(fields=['created_at', 'user']),
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['complaint_type', 'created_at']),
+            models.Index(fields=['complaint_type', 'status', 'created_at']),
+            # Covers the map grid aggregation, which groups by a geohash prefix
+            models.Index(fields=['geohash', 'complaint_type', 'status']),
+            # Duplicate detection looks up one type in a few neighbouring cells
+            models.Index(fields=['complaint_type', 'geohash']),
+        ]
 
     def __str__(self):
         return f"{self.complaint_type} - {self.user.username}"
 
+    def save(self, *args, **kwargs):
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geohash_encode(self.latitude, self.longitude, COMPLAINT_GEOHASH_PRECISION)
+        update_fields = kwargs.get('update_fields')
+        # Only rehash when the text is actually being written
+        if update_fields is None or {'title', 'description'} & set(update_fields):
+            self.simhash = simhash(f"{self.title} {self.description}")
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        if update_fields is not None and {'title', 'description'} & set(update_fields):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'simhash'}
+        super().save(*args, **kwargs)
+
 class Notification(models.Model):
     NOTIFICATION_TYPES = [
         ('COMPLAINT', 'Complaint'),
@@ -61,11 +115,60 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Personal notifications and broadcasts are listed together
+    is_broadcast = False
+    
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread counter on every page, and the per-user notification list
+            models.Index(fields=['user', 'is_read']),
+            models.Index(fields=['user', '-created_at']),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} - {self.title}"
+    
+    @property
+    def mark_read_url(self):
+        return reverse('mark_notification_read', args=[self.id])
+
+class Broadcast(models.Model):
+    """A city-wide alert stored once and merged into every user's notifications"""
+    NOTIFICATION_TYPES = Notification.NOTIFICATION_TYPES + [
+        ('ALERT', 'Alert'),
+    ]
+
+    title = models.CharField(max_length=100)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='broadcasts_sent')
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    is_broadcast = True
+    # Broadcasts are city-wide and never carry a location
+    latitude = None
+    longitude = None
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.notification_type} - {self.title}"
+
+    @property
+    def mark_read_url(self):
+        return reverse('mark_broadcast_read', args=[self.id])
+
+class BroadcastRead(models.Model):
+    """Sparse per-user read marker; a missing row means the broadcast is unread"""
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='reads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='broadcast_reads')
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('user', 'broadcast')
 
 class TrafficReport(models.Model):
     ISSUE_TYPES = [
@@ -86,6 +189,12 @@ class TrafficReport(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Partial index: Django filters booleans as a bare column, which
+            # SQLite can match against a condition but not an index key
+            models.Index(fields=['timestamp'], condition=models.Q(is_active=True),
+                         name='users_traffic_active_ts_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_type_display()} at ({self.latitude}, {self.longitude})"
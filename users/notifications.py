@@ -0,0 +1,34 @@
+from heapq import merge
+
+from django.db.models import Exists, OuterRef
+
+from .models import Broadcast, BroadcastRead, Notification
+
+
+def broadcasts_for(user):
+    """Broadcasts sent since the user joined, annotated with is_read"""
+    return Broadcast.objects.filter(created_at__gte=user.date_joined).annotate(
+        is_read=Exists(BroadcastRead.objects.filter(broadcast=OuterRef('pk'), user=user))
+    )
+
+
+def unread_notification_count(user):
+    """Unread personal notifications plus unread broadcasts for a user"""
+    personal = Notification.objects.filter(user=user, is_read=False).count()
+    broadcasts = broadcasts_for(user).filter(is_read=False).count()
+    return personal + broadcasts
+
+
+def notifications_for(user):
+    """Personal notifications and broadcasts for a user, newest first"""
+    personal = Notification.objects.filter(user=user).order_by('-created_at')
+    broadcasts = broadcasts_for(user).order_by('-created_at')
+    return list(merge(personal, broadcasts, key=lambda n: n.created_at, reverse=True))
+
+
+def mark_all_broadcasts_read(user):
+    unread = broadcasts_for(user).filter(is_read=False).values_list('id', flat=True)
+    BroadcastRead.objects.bulk_create(
+        [BroadcastRead(user=user, broadcast_id=broadcast_id) for broadcast_id in unread],
+        ignore_conflicts=True
+    )
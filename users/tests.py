@@ -1,3 +1,205 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from utils.maps_keys import MapsKeyPool
+from utils.testing import QueryPlanAssertions
+from .duplicates import covering_precision, find_duplicate
+from .views import COMPLAINT_GRID_MAX_CELLS
+from .models import Broadcast, BroadcastRead, Complaint, Notification, TrafficReport
+from .notifications import mark_all_broadcasts_read, notifications_for, unread_notification_count
+
+
+class QueryPlanTests(QueryPlanAssertions, TestCase):
+    """The hot query paths must be answered from an index, not a table scan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('planner')
+        cls.since = timezone.now() - timedelta(hours=24)
+
+    def test_complaint_filters(self):
+        self.assertUsesIndex(Complaint.objects.filter(status='PENDING').order_by('-created_at'))
+        self.assertUsesIndex(Complaint.objects.filter(complaint_type='GARBAGE').order_by('-created_at'))
+        self.assertUsesIndex(Complaint.objects.filter(complaint_type='GARBAGE', status='PENDING'))
+        self.assertUsesIndex(Complaint.objects.filter(created_at__gte=self.since).values('user').distinct())
+
+    def test_unread_notifications(self):
+        self.assertUsesIndex(Notification.objects.filter(user=self.user, is_read=False))
+        self.assertUsesIndex(Notification.objects.filter(user=self.user).order_by('-created_at'))
+
+    def test_active_traffic_reports(self):
+        self.assertUsesIndex(TrafficReport.objects.filter(is_active=True, timestamp__gte=self.since))
+
+
+class DuplicateDetectionTests(TestCase):
+    """Repeat reports of an open complaint nearby are matched to it"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('reporter')
+        cls.original = cls.complaint(latitude=20.0, longitude=77.0)
+
+    @classmethod
+    def complaint(cls, **kwargs):
+        fields = dict(
+            user=cls.user, title='Burst water pipe', description='Water pouring onto the road near the bus stop',
+            image='complaints/x.jpg', complaint_type='WATER_LEAK', latitude=20.0, longitude=77.0,
+        )
+        fields.update(kwargs)
+        return Complaint.objects.create(**fields)
+
+    def find(self, latitude=20.0, longitude=77.0, complaint_type='WATER_LEAK'):
+        return find_duplicate('Water pipe burst', 'Water pouring onto road by the bus stop',
+                              latitude, longitude, complaint_type)
+
+    def test_nearby_repeat_is_found(self):
+        self.assertEqual(self.find(longitude=77.0005), self.original)
+
+    def test_repeat_beyond_neighbouring_fine_cells_is_found(self):
+        # 145m apart, but two precision-7 cells apart at this latitude
+        original = self.complaint(latitude=20.0, longitude=78.00157)
+        self.assertEqual(self.find(longitude=78.00017), original)
+
+    def test_unrelated_reports_are_not_matched(self):
+        self.assertIsNone(self.find(longitude=77.005))
+        self.assertIsNone(self.find(complaint_type='POTHOLE'))
+        self.assertIsNone(find_duplicate('Broken streetlight', 'Lamp flickering all night', 20.0, 77.0, 'WATER_LEAK'))
+
+    def test_only_open_recent_originals_are_candidates(self):
+        Complaint.objects.filter(pk=self.original.pk).update(status='RESOLVED')
+        self.assertIsNone(self.find())
+        Complaint.objects.filter(pk=self.original.pk).update(
+            status='PENDING', created_at=timezone.now() - timedelta(days=31)
+        )
+        self.assertIsNone(self.find())
+
+    def test_search_cells_cover_radius(self):
+        self.assertEqual(covering_precision(0, 0.15), 7)
+        self.assertEqual(covering_precision(20, 0.15), 6)
+
+    def test_simhash_only_recomputed_with_text(self):
+        Complaint.objects.filter(pk=self.original.pk).update(simhash=123)
+        complaint = Complaint.objects.get(pk=self.original.pk)
+        complaint.status = 'IN_PROGRESS'
+        complaint.save(update_fields=['status'])
+        self.assertEqual(complaint.simhash, 123)
+        complaint.title = 'Burst main'
+        complaint.save(update_fields=['title'])
+        complaint.refresh_from_db()
+        self.assertNotEqual(complaint.simhash, 123)
+
+
+class ComplaintGridTests(TestCase):
+    """The map grid endpoint is private and its response size is bounded"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('mapper')
+        for i in range(3):
+            Complaint.objects.create(
+                user=cls.user, title='Garbage pile', description='Uncollected for days', image='complaints/x.jpg',
+                complaint_type='GARBAGE', latitude=19.07 + i * 0.01, longitude=72.87,
+            )
+
+    def test_requires_login(self):
+        response = self.client.get('/complaints/grid/', {'bbox': '19,72,20,73', 'zoom': 12})
+        self.assertEqual(response.status_code, 302)
+
+    def test_counts_cells(self):
+        self.client.force_login(self.user)
+        data = self.client.get('/complaints/grid/', {'bbox': '19,72,20,73', 'zoom': 12}).json()
+        self.assertTrue(data['success'])
+        self.assertEqual(sum(cell['count'] for cell in data['cells']), 3)
+
+    def test_large_viewport_at_high_zoom_is_capped(self):
+        self.client.force_login(self.user)
+        data = self.client.get('/complaints/grid/', {'bbox': '-60,-170,70,170', 'zoom': 20}).json()
+        self.assertTrue(data['success'])
+        self.assertEqual(sum(cell['count'] for cell in data['cells']), 3)
+        # The viewport is covered by 32 one-character cells, which split into 1024 at precision 2
+        self.assertEqual(data['precision'], 2)
+        self.assertLessEqual(len(data['cells']), COMPLAINT_GRID_MAX_CELLS)
+
+
+class MapsKeyPoolTests(SimpleTestCase):
+    """Keys that run out of quota or keep failing are skipped until they cool down"""
+
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch('utils.maps_keys.time.monotonic', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pool = MapsKeyPool(['key-a', 'key-b'], quota_cooldown=3600, error_cooldown=60, failure_threshold=2)
+
+    def respond(self, statuses):
+        """Patch requests.get so each key answers with its status from `statuses`"""
+        def get(endpoint, params, timeout):
+            return mock.Mock(status_code=200, json=lambda: {'status': statuses[params['key']]})
+        return mock.patch('utils.maps_keys.requests.get', side_effect=get)
+
+    def test_quota_error_opens_circuit_until_cooldown(self):
+        with self.respond({'key-a': 'OVER_QUERY_LIMIT', 'key-b': 'OK'}):
+            api_key, data = self.pool.request('https://maps.example/api', {})
+        self.assertEqual((api_key, data), ('key-b', {'status': 'OK'}))
+        self.assertEqual(self.pool.healthy_keys(), ['key-b'])
+
+        self.now += 3601
+        self.assertIn('key-a', self.pool.healthy_keys())
+
+    def test_repeated_errors_open_circuit(self):
+        self.pool.record_failure('key-a', 'timeout')
+        self.assertIn('key-a', self.pool.healthy_keys())
+        self.pool.record_failure('key-a', 'timeout')
+        self.assertEqual(self.pool.healthy_keys(), ['key-b'])
+        self.now += 61
+        self.assertIn('key-a', self.pool.healthy_keys())
+
+    def test_fastest_key_first(self):
+        self.pool.record_success('key-a', 0.5)
+        self.pool.record_success('key-b', 0.1)
+        self.assertEqual(self.pool.healthy_keys(), ['key-b', 'key-a'])
+        self.assertEqual(self.pool.best_key(), 'key-b')
+
+    def test_fails_fast_when_every_circuit_is_open(self):
+        for key in ('key-a', 'key-b'):
+            self.pool.record_failure(key, 'OVER_DAILY_LIMIT', quota=True)
+        with mock.patch('utils.maps_keys.requests.get') as get:
+            self.assertEqual(self.pool.request('https://maps.example/api', {}), (None, None))
+        get.assert_not_called()
+        self.assertIsNone(self.pool.best_key())
+
+
+class NotificationMergeTests(TestCase):
+    """Broadcasts are merged into each user's notifications with per-user read state"""
+
+    def setUp(self):
+        self.old = Broadcast.objects.create(title='Before joining', message='m', notification_type='ALERT')
+        Broadcast.objects.filter(pk=self.old.pk).update(created_at=timezone.now() - timedelta(days=2))
+        self.user = User.objects.create_user('resident', date_joined=timezone.now() - timedelta(days=1))
+        self.other = User.objects.create_user('neighbour', date_joined=timezone.now() - timedelta(days=1))
+        self.personal = Notification.objects.create(
+            user=self.user, title='Your complaint', message='m', notification_type='COMPLAINT'
+        )
+        self.broadcast = Broadcast.objects.create(title='Water cut', message='m', notification_type='ALERT')
+
+    def test_merged_newest_first_without_older_broadcasts(self):
+        self.assertEqual(
+            [n.title for n in notifications_for(self.user)],
+            ['Water cut', 'Your complaint'],
+        )
+
+    def test_read_state_is_per_user(self):
+        self.assertEqual(unread_notification_count(self.user), 2)
+        mark_all_broadcasts_read(self.user)
+        # Marking twice does not fail on the existing read rows
+        mark_all_broadcasts_read(self.user)
+
+        self.assertEqual(unread_notification_count(self.user), 1)
+        self.assertEqual(unread_notification_count(self.other), 1)
+        self.assertEqual(BroadcastRead.objects.filter(user=self.user).count(), 1)
+        broadcast = next(n for n in notifications_for(self.user) if getattr(n, 'is_broadcast', False))
+        self.assertTrue(broadcast.is_read)
@@ -13,11 +13,13 @@ urlpatterns = [
     path('complaints/', views.complaints_view, name='complaints'),
     path('complaints/submit/', views.submit_complaint, name='submit_complaint'),
     path('complaints/list/', views.get_complaints, name='get_complaints'),
+    path('complaints/grid/', views.complaints_grid, name='complaints_grid'),
     path('logout/', LogoutView.as_view(next_page='landing'), name='logout'),
     
     # New notification and location routes
     path('notifications/', views.notifications_view, name='notifications'),
     path('notifications/mark-read/<int:notification_id>/', views.mark_notification_read, name='mark_notification_read'),
+    path('notifications/mark-read/broadcast/<int:broadcast_id>/', views.mark_broadcast_read, name='mark_broadcast_read'),
     path('notifications/mark-all-read/', views.mark_all_notifications_read, name='mark_all_notifications_read'),
     path('update-location/', views.update_location, name='update_location'),
     path('nearby-incidents/', views.nearby_incidents, name='nearby_incidents'),
@@ -2,7 +2,9 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.models import User
 from django.contrib import messages
-from .models import UserProfile, Complaint, Notification, TrafficReport
+from .models import COMPLAINT_GEOHASH_PRECISION, UserProfile, Complaint, Notification, TrafficReport, Broadcast, BroadcastRead
+from .duplicates import find_duplicate
+from .notifications import mark_all_broadcasts_read, notifications_for, unread_notification_count
 import requests
 from django.conf import settings
 from datetime import datetime, timedelta
@@ -19,7 +21,11 @@ from geopy.distance import geodesic
 from django.utils import timezone
 import logging
 import os
+from django.db.models import Count, Q
+from django.db.models.functions import Substr
 from utils.cache import cached, maps_api_cache, working_api_key_cache
+from utils.geo import geohash_cells_covering, geohash_decode, geohash_range
+from utils.maps_keys import maps_key_pool
 
 logger = logging.getLogger(__name__)
 
@@ -56,7 +62,7 @@ def get_google_maps_api_key():
     return random.choice(GOOGLE_MAPS_API_KEYS)
 
 def try_google_maps_request(endpoint, params):
-    """Try each API key until one works for Google Maps API requests."""
+    """Send a Google Maps API request using the healthiest available key."""
     # Create a cache key based on the endpoint and params (excluding the API key)
     params_copy = params.copy()
     params_copy.pop('key', None)  # Remove API key if present
@@ -69,27 +75,14 @@ def try_google_maps_request(endpoint, params):
         logger.debug(f"Using cached Maps API response for {cache_key}")
         return cached_response
     
-    # Shuffle the keys to balance load
-    keys = GOOGLE_MAPS_API_KEYS.copy()
-    random.shuffle(keys)
-    
-    for api_key in keys:
-        try:
-            params['key'] = api_key
-            response = requests.get(endpoint, params=params, timeout=5)
-            
-            # Check if response is valid
-            if response.status_code == 200:
-                data = response.json()
-                if 'error_message' not in data and data.get('status') != 'REQUEST_DENIED':
-                    logger.info(f"Successfully used Google Maps API key: {api_key[:10]}...")
-                    # Cache the successful response
-                    maps_api_cache.set(cache_key, data)
-                    return data
-            
-            logger.warning(f"API key {api_key[:10]}... failed: {response.status_code}")
-        except Exception as e:
-            logger.error(f"Error with API key {api_key[:10]}...: {str(e)}")
+    # Route the request through the shared key pool, which skips keys whose
+    # circuit is open and fails fast when none are healthy
+    api_key, data = maps_key_pool.request(endpoint, params, timeout=5)
+    if data is not None and 'error_message' not in data:
+        logger.info(f"Successfully used Google Maps API key: {api_key[:10]}...")
+        # Cache the successful response
+        maps_api_cache.set(cache_key, data)
+        return data
     
     # If all keys fail, return None
     logger.error("All Google Maps API keys failed")
@@ -99,7 +92,7 @@ def try_google_maps_request(endpoint, params):
 def notifications_processor(request):
     context = {}
     if request.user.is_authenticated:
-        unread_count = Notification.objects.filter(user=request.user, is_read=False).count()
+        unread_count = unread_notification_count(request.user)
         context['unread_notifications_count'] = unread_count
         
     # Add API keys to context for templates
@@ -151,7 +144,7 @@ def signup_view(request):
 @login_required
 def dashboard_view(request):
     # Get unread notifications count for the navbar
-    unread_notifications_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_notifications_count = unread_notification_count(request.user)
     
     try:
         # Fetch current weather data
@@ -304,7 +297,7 @@ def air_quality(request):
     country = 'India'
     
     # Get unread notifications count for the navbar
-    unread_notifications_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_notifications_count = unread_notification_count(request.user)
     
     try:
         # Make API request to IQAir
@@ -426,7 +419,7 @@ def traffic(request):
     Enhanced traffic view with weather, routes, and conditions
     """
     # Get unread notifications count for the navbar
-    unread_notifications_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_notifications_count = unread_notification_count(request.user)
     
     try:
         # Fetch weather data (using OpenWeatherMap API as example)
@@ -539,7 +532,7 @@ def traffic(request):
 @login_required
 def complaints_view(request):
     # Get unread notifications count for the navbar
-    unread_notifications_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_notifications_count = unread_notification_count(request.user)
     
     context = {
         'google_maps_api_key': get_google_maps_api_key(),
@@ -559,14 +552,19 @@ def submit_complaint(request):
             longitude = float(request.POST.get('longitude'))
             complaint_type = request.POST.get('complaint_type')
 
-            # Configure Gemini API
-            genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            # Repeat reports of the same issue reuse the original's classification
+            original = find_duplicate(title, description, latitude, longitude, complaint_type)
+            if original is not None and original.ai_classification:
+                ai_classification = original.ai_classification
+            else:
+                # Configure Gemini API
+                genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
+                model = genai.GenerativeModel('gemini-1.5-flash')
 
-            # Generate AI classification
-            prompt = f"Classify this urban issue: Title: {title}. Description: {description}. Choose from these categories: Pothole, Water Leak, Broken Signal, Garbage, or Other. Also provide a brief analysis."
-            response = model.generate_content(prompt)
-            ai_classification = response.text
+                # Generate AI classification
+                prompt = f"Classify this urban issue: Title: {title}. Description: {description}. Choose from these categories: Pothole, Water Leak, Broken Signal, Garbage, or Other. Also provide a brief analysis."
+                response = model.generate_content(prompt)
+                ai_classification = response.text
 
             # Create complaint with the user-selected type
             complaint = Complaint.objects.create(
@@ -577,10 +575,11 @@ def submit_complaint(request):
                 latitude=latitude,
                 longitude=longitude,
                 ai_classification=ai_classification,
-                complaint_type=complaint_type
+                complaint_type=complaint_type,
+                duplicate_of=original
             )
 
-            return JsonResponse({'success': True})
+            return JsonResponse({'success': True, 'duplicate_of': original.id if original else None})
 
         except Exception as e:
             return JsonResponse({'success': False, 'error': str(e)})
@@ -608,6 +607,87 @@ def get_complaints(request):
     
     return JsonResponse({'complaints': complaints_data})
 
+# Upper bound on the cells one grid response can hold, whatever the viewport and zoom
+COMPLAINT_GRID_MAX_CELLS = 1024
+
+def grid_precision(zoom):
+    """Geohash precision giving a few cells per map tile at the given zoom level"""
+    return max(1, min(COMPLAINT_GEOHASH_PRECISION, (zoom + 2) * 2 // 5))
+
+def capped_grid_precision(covering, zoom, max_cells=COMPLAINT_GRID_MAX_CELLS):
+    """grid_precision(zoom), made coarser until the covering cannot split into more than max_cells"""
+    precision = grid_precision(zoom)
+    covering_precision = len(covering[0])
+    # Each extra character splits a cell into 32
+    while precision > covering_precision and len(covering) * 32 ** (precision - covering_precision) > max_cells:
+        precision -= 1
+    return precision
+
+@login_required
+def complaints_grid(request):
+    """Aggregate complaints inside a map viewport into geohash grid cells.
+
+    Takes bbox=south,west,north,east and zoom, plus optional type and status
+    filters. Counts are grouped by a prefix of Complaint.geohash in the
+    database, so the response size depends on the viewport, not on the
+    number of complaints. A large viewport at a high zoom gets coarser
+    cells, at most COMPLAINT_GRID_MAX_CELLS. Cells on the viewport edge are
+    counted whole.
+    """
+    try:
+        south, west, north, east = (float(value) for value in request.GET.get('bbox', '').split(','))
+        zoom = int(request.GET.get('zoom', 12))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'bbox must be south,west,north,east and zoom an integer'}, status=400)
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        return JsonResponse({'success': False, 'error': 'Invalid bounding box'}, status=400)
+
+    covering = geohash_cells_covering(south, west, north, east)
+    precision = capped_grid_precision(covering, zoom)
+    # Cover the viewport with cells no finer than the grid, so every grid
+    # cell touching it is either wholly inside the filter or not at all
+    viewport = Q()
+    for prefix in sorted({cell[:precision] for cell in covering}):
+        low, high = geohash_range(prefix)
+        viewport |= Q(geohash__gte=low, geohash__lt=high)
+
+    complaints = Complaint.objects.filter(viewport)
+    complaint_type = request.GET.get('type', 'ALL')
+    if complaint_type != 'ALL':
+        complaints = complaints.filter(complaint_type=complaint_type)
+    if request.GET.get('status'):
+        complaints = complaints.filter(status=request.GET['status'])
+
+    rows = (
+        complaints.annotate(cell=Substr('geohash', 1, precision))
+        .values('cell', 'complaint_type', 'status')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+
+    cells = {}
+    for row in rows:
+        cell = cells.get(row['cell'])
+        if cell is None:
+            latitude, longitude = geohash_decode(row['cell'])
+            cell = cells[row['cell']] = {
+                'cell': row['cell'],
+                'latitude': latitude,
+                'longitude': longitude,
+                'count': 0,
+                'by_type': {},
+                'by_status': {},
+            }
+        cell['count'] += row['count']
+        cell['by_type'][row['complaint_type']] = cell['by_type'].get(row['complaint_type'], 0) + row['count']
+        cell['by_status'][row['status']] = cell['by_status'].get(row['status'], 0) + row['count']
+
+    return JsonResponse({
+        'success': True,
+        'precision': precision,
+        'cells': sorted(cells.values(), key=lambda cell: cell['cell']),
+    })
+
 @require_http_methods(["GET", "POST"])
 def logout_view(request):
     logout(request)
@@ -615,11 +695,11 @@ def logout_view(request):
 
 @login_required
 def notifications_view(request):
-    # Get all notifications for the user
-    notifications = Notification.objects.filter(user=request.user)
+    # Get personal notifications merged with city-wide broadcasts
+    notifications = notifications_for(request.user)
     
     # Get unread notifications count
-    unread_notifications_count = notifications.filter(is_read=False).count()
+    unread_notifications_count = sum(1 for n in notifications if not n.is_read)
     
     context = {
         'notifications': notifications,
@@ -707,12 +787,26 @@ def mark_notification_read(request, notification_id):
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
 
+@login_required
+@require_http_methods(["POST"])
+def mark_broadcast_read(request, broadcast_id):
+    """Mark a city-wide broadcast as read for the current user"""
+    try:
+        broadcast = Broadcast.objects.get(id=broadcast_id)
+        BroadcastRead.objects.get_or_create(user=request.user, broadcast=broadcast)
+        return JsonResponse({'success': True})
+    except Broadcast.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Notification not found'})
+    except Exception as e:
+        return JsonResponse({'success': False, 'error': str(e)})
+
 @login_required
 @require_http_methods(["POST"])
 def mark_all_notifications_read(request):
     """Mark all notifications as read for a user"""
     try:
         Notification.objects.filter(user=request.user, is_read=False).update(is_read=True)
+        mark_all_broadcasts_read(request.user)
         return JsonResponse({'success': True})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)})
@@ -750,8 +844,10 @@ def generate_location_based_notifications(user, latitude, longitude):
         max_distance_km = 2  # Only very close complaints trigger notifications
         
         # Get recent complaints (last 24 hours)
+        # Repeat reports of an issue are left out so it is only announced once
         recent_complaints = Complaint.objects.filter(
-            created_at__gte=datetime.now() - timedelta(days=1)
+            created_at__gte=datetime.now() - timedelta(days=1),
+            duplicate_of__isnull=True
         )
         
         for complaint in recent_complaints:
@@ -857,10 +953,7 @@ def rain_alerts(request):
             'city_lat': 19.0760,
             'city_lng': 72.8777,
             'google_maps_api_key': get_google_maps_api_key(),
-            'unread_notifications_count': Notification.objects.filter(
-                user=request.user, 
-                is_read=False
-            ).count()
+            'unread_notifications_count': unread_notification_count(request.user)
         }
         
     except Exception as e:
@@ -875,10 +968,7 @@ def rain_alerts(request):
             'city_lat': 19.0760,
             'city_lng': 72.8777,
             'google_maps_api_key': get_google_maps_api_key(),
-            'unread_notifications_count': Notification.objects.filter(
-                user=request.user, 
-                is_read=False
-            ).count()
+            'unread_notifications_count': unread_notification_count(request.user)
         }
     
     return render(request, 'users/rain_alerts.html', context)
@@ -1039,10 +1129,7 @@ def energy_usage(request):
         'hourly_demand': json.dumps(hourly_demand),
         'hourly_labels': json.dumps(hourly_labels),
         'error': str(e) if 'e' in locals() else None,
-        'unread_notifications_count': Notification.objects.filter(
-            user=request.user, 
-            is_read=False
-        ).count()
+        'unread_notifications_count': unread_notification_count(request.user)
     }
     
     return render(request, 'users/energy_usage.html', context)
@@ -1050,11 +1137,11 @@ def energy_usage(request):
 @login_required
 def alerts_view(request):
     """View to display alerts and notifications for the user"""
-    # Get all notifications for the current user
-    alerts = Notification.objects.filter(user=request.user).order_by('-created_at')
+    # Get personal notifications merged with city-wide broadcasts
+    alerts = notifications_for(request.user)
     
     # Get unread notifications count for the navbar
-    unread_notifications_count = Notification.objects.filter(user=request.user, is_read=False).count()
+    unread_notifications_count = sum(1 for alert in alerts if not alert.is_read)
     
     return render(request, 'users/alerts.html', {
         'alerts': alerts,
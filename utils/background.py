@@ -0,0 +1,36 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for work that should not hold up the request/response cycle
+executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv('BACKGROUND_WORKERS', '4')),
+    thread_name_prefix='background',
+)
+
+
+def submit(pool, func, *args, **kwargs):
+    """Run a function on the given executor and return its Future.
+
+    Database connections opened by the task are closed when it finishes, as
+    Django only cleans up connections for threads it manages itself.
+    """
+    def task():
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            logger.exception(f"Background task {func.__name__} failed")
+            raise
+        finally:
+            connections.close_all()
+
+    return pool.submit(task)
+
+
+def run_in_background(func, *args, **kwargs):
+    """Run a function on the shared background pool and return its Future"""
+    return submit(executor, func, *args, **kwargs)
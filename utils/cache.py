@@ -45,6 +45,7 @@ class SimpleCache:
 # Create cache instances with different TTLs
 maps_api_cache = SimpleCache(default_ttl=3600)  # 1 hour for general Maps API responses
 working_api_key_cache = SimpleCache(default_ttl=1800)  # 30 minutes for working API keys
+dashboard_cache = SimpleCache(default_ttl=5)  # A few seconds for payloads polled by every open dashboard
 
 # Decorator for caching function results
 def cached(cache_instance, key_prefix=''):
@@ -0,0 +1,43 @@
+from django.template.loader import render_to_string
+from django.utils.html import escape, strip_tags
+
+
+class _Placeholder:
+    """Stands in for a context object, rendering each attribute as a marker"""
+
+    def __init__(self, name, fields):
+        for field in fields:
+            setattr(self, field, f"__{name}_{field}__")
+
+
+def _fill(template, markers, values, escape_values):
+    for marker, value in zip(markers, values):
+        value = str(value if value is not None else '')
+        template = template.replace(marker, escape(value) if escape_values else value)
+    return template
+
+
+class PreRenderedEmail:
+    """An email template rendered once, with per-recipient fields filled in later.
+
+    `recipient_name` is the context variable for the recipient and `fields`
+    the attributes the template reads from it, e.g. ('username',). The
+    template is rendered and stripped to plain text once with marker values,
+    and each recipient costs a few string replacements.
+    """
+
+    def __init__(self, template_name, context, recipient_name='user', fields=('username',)):
+        placeholder = _Placeholder(recipient_name, fields)
+        self.fields = tuple(fields)
+        self.markers = [getattr(placeholder, field) for field in self.fields]
+        self.html = render_to_string(template_name, dict(context, **{recipient_name: placeholder}))
+        self.text = strip_tags(self.html)
+
+    def render(self, recipient):
+        """Return (html_message, plain_message) for one recipient"""
+        values = [getattr(recipient, field) for field in self.fields]
+        return _fill(self.html, self.markers, values, True), _fill(self.text, self.markers, values, False)
+
+    def render_many(self, recipients):
+        """Return (html_message, plain_message) for each recipient, in order"""
+        return [self.render(recipient) for recipient in recipients]
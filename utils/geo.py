@@ -0,0 +1,235 @@
+"""Geographic helpers: distances and geohash cells used to quantize coordinates"""
+
+import heapq
+import math
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+_DECODE_MAP = {c: i for i, c in enumerate(_BASE32)}
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometers"""
+    lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def geohash_encode(latitude, longitude, precision=6):
+    """Encode a latitude/longitude pair into a geohash string"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    geohash = []
+    bit, ch, even = 0, 0, True
+
+    while len(geohash) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if longitude >= mid:
+                ch |= 1 << (4 - bit)
+                lng_range[0] = mid
+            else:
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if latitude >= mid:
+                ch |= 1 << (4 - bit)
+                lat_range[0] = mid
+            else:
+                lat_range[1] = mid
+        even = not even
+
+        if bit < 4:
+            bit += 1
+        else:
+            geohash.append(_BASE32[ch])
+            bit, ch = 0, 0
+
+    return ''.join(geohash)
+
+
+def geohash_bbox(geohash):
+    """Return the (south, west, north, east) bounds of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    even = True
+
+    for c in geohash:
+        value = _DECODE_MAP[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lng_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+
+    return lat_range[0], lng_range[0], lat_range[1], lng_range[1]
+
+
+def geohash_decode(geohash):
+    """Return the (latitude, longitude) centre of a geohash cell"""
+    south, west, north, east = geohash_bbox(geohash)
+    return (south + north) / 2, (west + east) / 2
+
+
+def geohash_neighbours(geohash):
+    """Return the eight cells surrounding a geohash cell at the same precision"""
+    south, west, north, east = geohash_bbox(geohash)
+    lat_step = north - south
+    lng_step = east - west
+    lat, lng = (south + north) / 2, (west + east) / 2
+    precision = len(geohash)
+
+    cells = []
+    for dlat in (-1, 0, 1):
+        for dlng in (-1, 0, 1):
+            if dlat == 0 and dlng == 0:
+                continue
+            n_lat = lat + dlat * lat_step
+            if n_lat > 90 or n_lat < -90:
+                continue
+            n_lng = (lng + dlng * lng_step + 180) % 360 - 180
+            cells.append(geohash_encode(n_lat, n_lng, precision))
+    return cells
+
+
+def geohash_range(prefix):
+    """Return (low, high) bounds so that low <= geohash < high covers a cell.
+
+    Lets a B-tree index on a geohash column answer "inside this cell" as a
+    range scan, which LIKE/startswith queries cannot always do.
+    """
+    return prefix, prefix + '{'  # '{' sorts right after 'z', the last base32 digit
+
+
+def geohash_cells_covering(south, west, north, east, max_cells=32):
+    """Return the fewest geohash cells, at a single precision, covering a box.
+
+    Uses the finest precision whose covering still fits in `max_cells`.
+    """
+    best = [geohash_encode((south + north) / 2, (west + east) / 2, 1)]
+    for precision in range(1, 10):
+        lng_bits = math.ceil(5 * precision / 2)
+        lat_bits = 5 * precision // 2
+        lat_step = 180.0 / 2 ** lat_bits
+        lng_step = 360.0 / 2 ** lng_bits
+        rows = math.floor((north + 90) / lat_step) - math.floor((south + 90) / lat_step) + 1
+        cols = math.floor((east + 180) / lng_step) - math.floor((west + 180) / lng_step) + 1
+        if rows * cols > max_cells:
+            break
+
+        cells = set()
+        for row in range(rows):
+            lat = min(north, south + row * lat_step)
+            for col in range(cols):
+                lng = min(east, west + col * lng_step)
+                cells.add(geohash_encode(lat, lng, precision))
+        # The box's far edges may start a new row or column of cells
+        for lat in (south, north):
+            for lng in (west, east):
+                cells.add(geohash_encode(lat, lng, precision))
+        best = sorted(cells)
+    return best
+
+
+def circle_bbox(latitude, longitude, radius_km):
+    """Return the (south, west, north, east) box enclosing a circle"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    dlng = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    return (max(-90.0, latitude - dlat), max(-180.0, longitude - dlng),
+            min(90.0, latitude + dlat), min(180.0, longitude + dlng))
+
+
+def point_in_polygon(latitude, longitude, polygon):
+    """Ray-casting test of a point against a polygon of (lat, lng) vertices"""
+    inside = False
+    j = len(polygon) - 1
+    for i in range(len(polygon)):
+        lat_i, lng_i = polygon[i]
+        lat_j, lng_j = polygon[j]
+        if (lat_i > latitude) != (lat_j > latitude):
+            crossing = lng_i + (latitude - lat_i) * (lng_j - lng_i) / (lat_j - lat_i)
+            if longitude < crossing:
+                inside = not inside
+        j = i
+    return inside
+
+
+def _to_unit_vector(latitude, longitude):
+    lat, lng = math.radians(latitude), math.radians(longitude)
+    return (math.cos(lat) * math.cos(lng), math.cos(lat) * math.sin(lng), math.sin(lat))
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class PointIndex:
+    """Static KD-tree over lat/lng points for nearest-neighbour queries.
+
+    Points are projected onto the unit sphere so that straight-line (chord)
+    distance orders neighbours the same way great-circle distance does, which
+    keeps queries correct across the antimeridian and near the poles.
+    """
+
+    def __init__(self, points):
+        # points: iterable of (latitude, longitude, payload)
+        items = [(_to_unit_vector(lat, lng), payload) for lat, lng, payload in points]
+        self._size = len(items)
+        self._root = self._build(items, 0)
+
+    def __len__(self):
+        return self._size
+
+    def _build(self, items, depth):
+        if not items:
+            return None
+        axis = depth % 3
+        items.sort(key=lambda item: item[0][axis])
+        mid = len(items) // 2
+        vector, payload = items[mid]
+        return (vector, payload, axis,
+                self._build(items[:mid], depth + 1),
+                self._build(items[mid + 1:], depth + 1))
+
+    def nearest(self, latitude, longitude, k=1, max_km=None):
+        """Return up to k (distance_km, payload) pairs, closest first"""
+        if self._root is None or k <= 0:
+            return []
+
+        target = _to_unit_vector(latitude, longitude)
+        best = []  # max-heap of (-squared_distance, counter, payload)
+        counter = 0
+        stack = [(self._root, 0.0)]
+
+        while stack:
+            node, bound = stack.pop()
+            # bound is the squared distance to the splitting plane that put this
+            # subtree on the far side; skip it if it can no longer improve results
+            if node is None or (len(best) == k and bound >= -best[0][0]):
+                continue
+            vector, payload, axis, left, right = node
+            dist_sq = sum((a - b) ** 2 for a, b in zip(vector, target))
+            if len(best) < k:
+                heapq.heappush(best, (-dist_sq, counter, payload))
+            elif dist_sq < -best[0][0]:
+                heapq.heapreplace(best, (-dist_sq, counter, payload))
+            counter += 1
+
+            diff = target[axis] - vector[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            stack.append((far, diff * diff))
+            stack.append((near, bound))
+
+        results = sorted(((-neg, payload) for neg, _, payload in best), key=lambda r: r[0])
+        results = [(_chord_to_km(math.sqrt(dist_sq)), payload) for dist_sq, payload in results]
+        if max_km is not None:
+            results = [r for r in results if r[0] <= max_km]
+        return results
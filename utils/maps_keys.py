@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+import logging
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Google Maps statuses that mean the key itself is exhausted or rejected
+QUOTA_STATUSES = ('OVER_QUERY_LIMIT', 'OVER_DAILY_LIMIT', 'REQUEST_DENIED')
+
+
+class KeyHealth:
+    """Success/failure counters and circuit state for a single API key"""
+
+    def __init__(self, key):
+        self.key = key
+        self.successes = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None  # Exponentially weighted moving average, in seconds
+        self.open_until = 0.0
+        self.last_error = None
+
+    def is_available(self, now):
+        return self.open_until <= now
+
+    def as_dict(self, now):
+        return {
+            'key': f"{self.key[:10]}...",
+            'successes': self.successes,
+            'failures': self.failures,
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'circuit_open': not self.is_available(now),
+            'retry_in': max(0, round(self.open_until - now)),
+            'last_error': self.last_error,
+        }
+
+
+class MapsKeyPool:
+    """Pool of Google Maps API keys with per-key health tracking.
+
+    Keys that hit a quota status have their circuit opened for `quota_cooldown`
+    seconds; keys that keep failing for other reasons are opened for
+    `error_cooldown` seconds after `failure_threshold` consecutive failures.
+    Requests go to the healthy key with the lowest observed latency, and when
+    every circuit is open the pool fails fast without touching the network.
+    """
+
+    def __init__(self, keys, quota_cooldown=3600, error_cooldown=60,
+                 failure_threshold=3, latency_alpha=0.3):
+        self.quota_cooldown = quota_cooldown
+        self.error_cooldown = error_cooldown
+        self.failure_threshold = failure_threshold
+        self.latency_alpha = latency_alpha
+        self._health = {key: KeyHealth(key) for key in keys if key}
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self._health)
+
+    def healthy_keys(self):
+        """Return keys with a closed circuit, fastest first.
+
+        Keys without a latency sample yet sort first so every key gets probed.
+        """
+        now = time.monotonic()
+        with self._lock:
+            healthy = [h for h in self._health.values() if h.is_available(now)]
+            healthy.sort(key=lambda h: (h.latency is not None, h.latency or 0, h.consecutive_failures))
+            return [h.key for h in healthy]
+
+    def best_key(self):
+        """Return the preferred healthy key, or None if every circuit is open"""
+        keys = self.healthy_keys()
+        return keys[0] if keys else None
+
+    def record_success(self, key, latency):
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                return
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.open_until = 0.0
+            if health.latency is None:
+                health.latency = latency
+            else:
+                health.latency = self.latency_alpha * latency + (1 - self.latency_alpha) * health.latency
+
+    def record_failure(self, key, reason, quota=False):
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                return
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.last_error = reason
+            if quota:
+                health.open_until = time.monotonic() + self.quota_cooldown
+                logger.warning(f"Opening circuit for Maps API key {key[:10]}... ({reason})")
+            elif health.consecutive_failures >= self.failure_threshold:
+                health.open_until = time.monotonic() + self.error_cooldown
+                logger.warning(f"Opening circuit for Maps API key {key[:10]}... after "
+                               f"{health.consecutive_failures} consecutive failures")
+
+    def request(self, endpoint, params, timeout=5):
+        """Perform a GET against a Maps endpoint using the healthiest key.
+
+        Returns a tuple of (key, data), or (None, None) if no key succeeded.
+        """
+        keys = self.healthy_keys()
+        if not keys:
+            logger.error("No healthy Google Maps API keys available, failing fast")
+            return None, None
+
+        for api_key in keys:
+            request_params = dict(params, key=api_key)
+            started = time.monotonic()
+            try:
+                response = requests.get(endpoint, params=request_params, timeout=timeout)
+                data = response.json()
+            except Exception as e:
+                self.record_failure(api_key, str(e))
+                logger.error(f"Error with Maps API key {api_key[:10]}...: {str(e)}")
+                continue
+
+            status = data.get('status')
+            if response.status_code == 200 and status not in QUOTA_STATUSES:
+                self.record_success(api_key, time.monotonic() - started)
+                return api_key, data
+
+            self.record_failure(api_key, status or f"HTTP {response.status_code}",
+                                quota=status in QUOTA_STATUSES)
+
+        return None, None
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [h.as_dict(now) for h in self._health.values()]
+
+
+# Shared pool so that key health is remembered across apps and requests
+maps_key_pool = MapsKeyPool([os.getenv('GOOGLE_MAPS_API_KEY')] if os.getenv('GOOGLE_MAPS_API_KEY') else [])
@@ -0,0 +1,42 @@
+"""SimHash fingerprints for spotting near-identical short texts"""
+
+import hashlib
+import re
+
+SIMHASH_BITS = 64
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+# Words too common to say anything about which issue a report describes
+STOPWORDS = frozenset(
+    'a an and are at be by for from in is it its my near of on or our that the there this to was with'.split()
+)
+
+
+def _features(text):
+    """Lower-cased words, less stopwords; word pairs proved too noisy for short reports"""
+    return [word for word in _WORD_RE.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text):
+    """Return a 64-bit SimHash of text as a signed integer.
+
+    Similar texts get fingerprints that differ in few bits. The value is
+    signed so it fits a database BigIntegerField.
+    """
+    weights = [0] * SIMHASH_BITS
+    for feature in _features(text or ''):
+        h = _hash(feature)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    value = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    return value - (1 << SIMHASH_BITS) if value >= 1 << (SIMHASH_BITS - 1) else value
+
+
+def hamming_distance(a, b):
+    """Number of differing bits between two fingerprints"""
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count('1')
@@ -0,0 +1,16 @@
+"""Assertions shared by the apps' test suites"""
+
+from django.db import connection
+
+
+class QueryPlanAssertions:
+    """Mixin for TestCase classes checking that queries are served by an index"""
+
+    def assertUsesIndex(self, queryset):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Query plans are checked against SQLite')
+        plan = queryset.explain()
+        self.assertRegex(plan, r'USING (COVERING )?INDEX', plan)
+        for line in plan.splitlines():
+            if ' SCAN ' in f' {line} ' and 'USING' not in line:
+                self.fail(f"Full table scan in query plan:\n{plan}")